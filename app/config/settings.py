@@ -19,6 +19,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     # Third party apps
     "rest_framework",
     "rest_framework.authtoken",
@@ -71,6 +72,28 @@ DATABASES = {
 }
 
 
+API_CACHE_MAX_ENTRIES = int(os.environ.get("API_CACHE_MAX_ENTRIES", 1000))
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    # Per-user API response cache. Local memory evicts the least recently
+    # used entry once MAX_ENTRIES is reached.
+    "api": {
+        "BACKEND": os.environ.get(
+            "API_CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.environ.get("API_CACHE_LOCATION", "recipe-api"),
+        "TIMEOUT": int(os.environ.get("API_CACHE_TIMEOUT", 300)),
+        "OPTIONS": {
+            "MAX_ENTRIES": API_CACHE_MAX_ENTRIES,
+            "CULL_FREQUENCY": API_CACHE_MAX_ENTRIES,
+        },
+    },
+}
+
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator",
@@ -104,12 +127,38 @@ MEDIA_URL = "/static/media/"
 MEDIA_ROOT = "/vol/web/media"
 STATIC_ROOT = "/vol/web/static"
 
+# Directory assembling chunked image uploads, outside of MEDIA_ROOT so that
+# partial files are never served, and the largest image accepted.
+CHUNKED_UPLOAD_ROOT = os.environ.get("CHUNKED_UPLOAD_ROOT", "/vol/web/uploads")
+MAX_IMAGE_UPLOAD_SIZE = int(os.environ.get("MAX_IMAGE_UPLOAD_SIZE", 20 * 1024 * 1024))
+
+# Seconds a chunked upload can stay open before it expires and is collected
+# by `collect_orphaned_images`, and how many each user can have open.
+CHUNKED_UPLOAD_TTL = int(os.environ.get("CHUNKED_UPLOAD_TTL", 24 * 60 * 60))
+MAX_OPEN_UPLOADS = int(os.environ.get("MAX_OPEN_UPLOADS", 10))
+
+# How media files are handed to the front proxy: "x-accel-redirect" (nginx,
+# from the internal location MEDIA_ACCEL_PREFIX aliased to MEDIA_ROOT),
+# "x-sendfile" (Apache, lighttpd), or empty to serve them from Django, which
+# ties up a worker per download and is only the default in DEBUG.
+MEDIA_SENDFILE = os.environ.get("MEDIA_SENDFILE", "" if DEBUG else "x-accel-redirect")
+MEDIA_ACCEL_PREFIX = os.environ.get("MEDIA_ACCEL_PREFIX", "/protected/media/")
+
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 AUTH_USER_MODEL = "core.User"
 
 REST_FRAMEWORK = {
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    "DEFAULT_RENDERER_CLASSES": [
+        "core.renderers.JSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "core.parsers.JSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
 }
 
 SPECTACULAR_SETTINGS = {
@@ -0,0 +1,48 @@
+"""
+Django command to process recipe image derivative jobs.
+"""
+import os
+import socket
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from core.models import ImageDerivativeJob
+from recipe.images import generate_derivatives
+
+
+class Command(BaseCommand):
+    """
+    Django command to generate recipe image derivatives.
+
+    Jobs are queued in the database when images are uploaded, so they
+    survive restarts and are shared by any number of these workers, which
+    claim them with `SELECT ... FOR UPDATE SKIP LOCKED`.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true")
+        parser.add_argument("--poll", type=float, default=1.0)
+        parser.add_argument("--stale-after", type=int, default=300)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        worker = f"{socket.gethostname()}:{os.getpid()}"
+        stale_after = timedelta(seconds=options["stale_after"])
+        while True:
+            job = ImageDerivativeJob.objects.claim(worker, stale_after)
+            if job is None:
+                if options["once"]:
+                    return
+                time.sleep(options["poll"])
+                continue
+
+            try:
+                generate_derivatives(job.name, job.overwrite)
+            except Exception as exc:
+                ImageDerivativeJob.objects.finish(job, message=str(exc) or repr(exc))
+                self.stderr.write(f"Derivatives of {job.name} failed: {exc}")
+                continue
+            if ImageDerivativeJob.objects.finish(job):
+                self.stdout.write(f"Derivatives of {job.name} generated.")
@@ -0,0 +1,56 @@
+"""
+Django command to process recipe import jobs.
+"""
+import os
+import socket
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from core.models import ImportJob
+from recipe.imports import RecipeImporter, ClaimLost
+
+
+class Command(BaseCommand):
+    """
+    Django command to process import jobs.
+
+    Any number of these workers can run side by side: jobs are claimed
+    with `SELECT ... FOR UPDATE SKIP LOCKED`, and a job whose worker stops
+    sending heartbeats is picked up by another one.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true")
+        parser.add_argument("--batch-size", type=int, default=None)
+        parser.add_argument("--poll", type=float, default=5.0)
+        parser.add_argument("--stale-after", type=int, default=300)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        worker = f"{socket.gethostname()}:{os.getpid()}"
+        stale_after = timedelta(seconds=options["stale_after"])
+        while True:
+            job = ImportJob.objects.claim(worker, stale_after)
+            if job is None:
+                if options["once"]:
+                    return
+                time.sleep(options["poll"])
+                continue
+
+            self.stdout.write(f"Processing import {job.id}...")
+            try:
+                RecipeImporter(job, worker, options["batch_size"]).run()
+            except ClaimLost:
+                self.stdout.write(f"Import {job.id} was taken over by another worker.")
+                continue
+            except Exception as exc:
+                self.stderr.write(f"Import {job.id} failed: {exc}")
+                continue
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Import {job.id} done: {job.created_rows} created, "
+                    f"{job.failed_rows} failed."
+                )
+            )
@@ -0,0 +1,45 @@
+"""
+Django command to repair the recipe counts of tags and ingredients.
+"""
+from django.core.management.base import BaseCommand
+from django.db.models import Max
+
+from core.models import Tag, Ingredient
+
+
+class Command(BaseCommand):
+    """
+    Django command to reconcile recipe counts with the through tables.
+
+    Counts are kept in sync by database triggers, so this only repairs
+    drift, one ID range at a time to keep each UPDATE short.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=10000)
+        parser.add_argument("--dry-run", action="store_true")
+
+    def reconcile(self, model, batch_size, dry_run):
+        """Repair the counts of `model` and return the number of rows fixed."""
+        last_id = model.objects.aggregate(last=Max("id"))["last"] or 0
+        fixed = 0
+        for start in range(0, last_id, batch_size):
+            queryset = model.objects.filter(id__gt=start, id__lte=start + batch_size)
+            if dry_run:
+                actual = model.objects.recipe_count_subquery()
+                fixed += queryset.exclude(recipe_count=actual).count()
+            else:
+                fixed += model.objects.reconcile_recipe_counts(queryset)
+        return fixed
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        for model in [Tag, Ingredient]:
+            fixed = self.reconcile(model, options["batch_size"], options["dry_run"])
+            verb = "would be repaired" if options["dry_run"] else "repaired"
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"{model._meta.verbose_name_plural.capitalize()}: "
+                    f"{fixed} counts {verb}."
+                )
+            )
@@ -0,0 +1,46 @@
+# Generated by Django 4.0.10 on 2026-10-18 20:05
+
+from django.contrib.postgres.operations import BtreeGinExtension, TrigramExtension
+from django.db import migrations
+
+TABLES = ["core_tag", "core_ingredient"]
+
+CREATE_SQL = """
+CREATE INDEX {table}_user_name_prefix ON {table}
+(user_id, upper(name) text_pattern_ops);
+
+CREATE INDEX {table}_user_name_trgm ON {table}
+USING gin (user_id, name gin_trgm_ops);
+"""
+
+DROP_SQL = """
+DROP INDEX IF EXISTS {table}_user_name_prefix;
+DROP INDEX IF EXISTS {table}_user_name_trgm;
+"""
+
+
+def create_name_indexes(apps, schema_editor):
+    """Index names per user for prefix and trigram lookups on PostgreSQL."""
+    if schema_editor.connection.vendor == "postgresql":
+        for table in TABLES:
+            schema_editor.execute(CREATE_SQL.format(table=table))
+
+
+def drop_name_indexes(apps, schema_editor):
+    """Remove the name lookup indexes on PostgreSQL."""
+    if schema_editor.connection.vendor == "postgresql":
+        for table in TABLES:
+            schema_editor.execute(DROP_SQL.format(table=table))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_recipe_search_vector'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        BtreeGinExtension(),
+        migrations.RunPython(create_name_indexes, drop_name_indexes),
+    ]
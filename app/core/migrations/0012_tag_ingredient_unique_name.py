@@ -0,0 +1,72 @@
+# Generated by Django 4.0.10 on 2026-10-18 20:20
+
+from django.db import migrations, models
+import django.db.models.expressions
+import django.db.models.functions.text
+from django.db.models import Count, Min
+from django.db.models.functions import Lower
+
+RELATIONS = {"Tag": "tags", "Ingredient": "ingredients"}
+
+
+def merge_duplicate_names(apps, schema_editor):
+    """
+    Merge tags and ingredients whose names only differ by case.
+
+    The oldest object of each group is kept, recipes linked to the others
+    are linked to it instead, and the others are deleted.
+    """
+    Recipe = apps.get_model("core", "Recipe")
+    for model_name, relation in RELATIONS.items():
+        model = apps.get_model("core", model_name)
+        field = Recipe._meta.get_field(relation)
+        through = field.remote_field.through
+        target = f"{field.m2m_reverse_field_name()}_id"
+
+        named = model.objects.annotate(key=Lower("name"))
+        groups = (
+            named.values("user_id", "key")
+            .annotate(count=Count("id"), keep=Min("id"))
+            .filter(count__gt=1)
+        )
+        for group in groups:
+            duplicates = list(
+                named.filter(user_id=group["user_id"], key=group["key"])
+                .exclude(id=group["keep"])
+                .values_list("id", flat=True)
+            )
+            recipe_ids = through.objects.filter(
+                **{f"{target}__in": duplicates}
+            ).values_list("recipe_id", flat=True)
+            through.objects.bulk_create(
+                [
+                    through(recipe_id=recipe_id, **{target: group["keep"]})
+                    for recipe_id in set(recipe_ids)
+                ],
+                ignore_conflicts=True,
+            )
+            model.objects.filter(id__in=duplicates).delete()
+
+    if schema_editor.connection.vendor == "postgresql":
+        # Fire the deferred foreign key checks queued by the deletes now, as
+        # PostgreSQL cannot index a table with pending trigger events.
+        schema_editor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_collectionversion'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_names, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(django.db.models.expressions.F('user'), django.db.models.functions.text.Lower('name'), name='core_ingredient_user_lower_name_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='tag',
+            constraint=models.UniqueConstraint(django.db.models.expressions.F('user'), django.db.models.functions.text.Lower('name'), name='core_tag_user_lower_name_uniq'),
+        ),
+    ]
@@ -0,0 +1,138 @@
+# Generated by Django 4.0.10 on 2026-10-18 20:28
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+# Through table, counted table and the through column referencing it.
+COUNTERS = [
+    ("core_recipe_tags", "core_tag", "tag_id"),
+    ("core_recipe_ingredients", "core_ingredient", "ingredient_id"),
+]
+
+POSTGRESQL_CREATE_SQL = """
+CREATE FUNCTION {through}_count_insert() RETURNS trigger AS $$
+BEGIN
+    UPDATE {target} SET recipe_count = {target}.recipe_count + delta.n
+    FROM (SELECT {column}, count(*) AS n FROM new_rows GROUP BY {column}) AS delta
+    WHERE {target}.id = delta.{column};
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE FUNCTION {through}_count_delete() RETURNS trigger AS $$
+BEGIN
+    UPDATE {target} SET recipe_count = {target}.recipe_count - delta.n
+    FROM (SELECT {column}, count(*) AS n FROM old_rows GROUP BY {column}) AS delta
+    WHERE {target}.id = delta.{column};
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER {through}_count_insert_trigger
+AFTER INSERT ON {through} REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION {through}_count_insert();
+
+CREATE TRIGGER {through}_count_delete_trigger
+AFTER DELETE ON {through} REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION {through}_count_delete();
+"""
+
+POSTGRESQL_DROP_SQL = """
+DROP TRIGGER IF EXISTS {through}_count_insert_trigger ON {through};
+DROP TRIGGER IF EXISTS {through}_count_delete_trigger ON {through};
+DROP FUNCTION IF EXISTS {through}_count_insert();
+DROP FUNCTION IF EXISTS {through}_count_delete();
+"""
+
+SQLITE_CREATE_SQL = [
+    """
+    CREATE TRIGGER {through}_count_insert_trigger AFTER INSERT ON {through}
+    BEGIN
+        UPDATE {target} SET recipe_count = recipe_count + 1 WHERE id = NEW.{column};
+    END
+    """,
+    """
+    CREATE TRIGGER {through}_count_delete_trigger AFTER DELETE ON {through}
+    BEGIN
+        UPDATE {target} SET recipe_count = recipe_count - 1 WHERE id = OLD.{column};
+    END
+    """,
+]
+
+SQLITE_DROP_SQL = [
+    "DROP TRIGGER IF EXISTS {through}_count_insert_trigger",
+    "DROP TRIGGER IF EXISTS {through}_count_delete_trigger",
+]
+
+
+def create_count_triggers(apps, schema_editor):
+    """Keep recipe counts in sync with the through tables, then backfill them."""
+    vendor = schema_editor.connection.vendor
+    for through, target, column in COUNTERS:
+        if vendor == "postgresql":
+            schema_editor.execute(
+                POSTGRESQL_CREATE_SQL.format(
+                    through=through, target=target, column=column
+                )
+            )
+        elif vendor == "sqlite":
+            for sql in SQLITE_CREATE_SQL:
+                schema_editor.execute(
+                    sql.format(through=through, target=target, column=column)
+                )
+
+    Recipe = apps.get_model("core", "Recipe")
+    for model_name, relation in [("Tag", "tags"), ("Ingredient", "ingredients")]:
+        model = apps.get_model("core", model_name)
+        field = Recipe._meta.get_field(relation)
+        column = field.m2m_reverse_field_name()
+        counts = (
+            field.remote_field.through.objects.filter(**{column: OuterRef("pk")})
+            .values(column)
+            .annotate(count=Count("*"))
+            .values("count")
+        )
+        model.objects.update(
+            recipe_count=Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+        )
+
+
+def drop_count_triggers(apps, schema_editor):
+    """Remove the recipe count triggers."""
+    vendor = schema_editor.connection.vendor
+    for through, target, column in COUNTERS:
+        if vendor == "postgresql":
+            schema_editor.execute(POSTGRESQL_DROP_SQL.format(through=through))
+        elif vendor == "sqlite":
+            for sql in SQLITE_DROP_SQL:
+                schema_editor.execute(sql.format(through=through))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_importjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='recipe_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='recipe_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(create_count_triggers, drop_count_triggers),
+        migrations.AddIndex(
+            model_name='ingredient',
+            index=models.Index(fields=['user', 'recipe_count'], name='core_ingredient_user_count_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['user', 'recipe_count'], name='core_tag_user_count_idx'),
+        ),
+    ]
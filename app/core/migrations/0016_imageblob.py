@@ -0,0 +1,128 @@
+# Generated by Django 4.0.10 on 2026-10-18 20:37
+
+import core.models
+import core.storage
+from django.db import migrations, models
+from django.db.models import Count
+import django.utils.timezone
+
+POSTGRESQL_CREATE_SQL = """
+CREATE FUNCTION core_recipe_image_ref_count() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' AND OLD.image IS NOT DISTINCT FROM NEW.image THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.image <> '' THEN
+        UPDATE core_imageblob SET ref_count = ref_count - 1 WHERE name = OLD.image;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.image <> '' THEN
+        INSERT INTO core_imageblob (name, ref_count, created) VALUES (NEW.image, 1, now())
+        ON CONFLICT (name) DO UPDATE SET ref_count = core_imageblob.ref_count + 1;
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER core_recipe_image_ref_count_trigger
+AFTER INSERT OR DELETE OR UPDATE OF image ON core_recipe
+FOR EACH ROW EXECUTE FUNCTION core_recipe_image_ref_count();
+"""
+
+POSTGRESQL_DROP_SQL = """
+DROP TRIGGER IF EXISTS core_recipe_image_ref_count_trigger ON core_recipe;
+DROP FUNCTION IF EXISTS core_recipe_image_ref_count();
+"""
+
+SQLITE_ACQUIRE_SQL = """
+INSERT INTO core_imageblob (name, ref_count, created)
+SELECT NEW.image, 1, CURRENT_TIMESTAMP WHERE NEW.image <> ''
+ON CONFLICT (name) DO UPDATE SET ref_count = ref_count + 1;
+"""
+
+SQLITE_RELEASE_SQL = """
+UPDATE core_imageblob SET ref_count = ref_count - 1 WHERE name = OLD.image;
+"""
+
+SQLITE_CREATE_SQL = [
+    f"""
+    CREATE TRIGGER core_recipe_image_insert_trigger AFTER INSERT ON core_recipe
+    BEGIN {SQLITE_ACQUIRE_SQL} END
+    """,
+    f"""
+    CREATE TRIGGER core_recipe_image_delete_trigger AFTER DELETE ON core_recipe
+    BEGIN {SQLITE_RELEASE_SQL} END
+    """,
+    f"""
+    CREATE TRIGGER core_recipe_image_update_trigger AFTER UPDATE OF image ON core_recipe
+    WHEN OLD.image IS NOT NEW.image
+    BEGIN {SQLITE_RELEASE_SQL} {SQLITE_ACQUIRE_SQL} END
+    """,
+]
+
+SQLITE_DROP_SQL = [
+    "DROP TRIGGER IF EXISTS core_recipe_image_insert_trigger",
+    "DROP TRIGGER IF EXISTS core_recipe_image_delete_trigger",
+    "DROP TRIGGER IF EXISTS core_recipe_image_update_trigger",
+]
+
+
+def create_ref_count_triggers(apps, schema_editor):
+    """Keep image blob reference counts in sync with recipes, then backfill them."""
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.execute(POSTGRESQL_CREATE_SQL)
+    elif vendor == "sqlite":
+        for sql in SQLITE_CREATE_SQL:
+            schema_editor.execute(sql)
+
+    Recipe = apps.get_model("core", "Recipe")
+    ImageBlob = apps.get_model("core", "ImageBlob")
+    counts = (
+        Recipe.objects.exclude(image="")
+        .exclude(image__isnull=True)
+        .values("image")
+        .annotate(count=Count("*"))
+        .order_by()
+    )
+    ImageBlob.objects.bulk_create(
+        [ImageBlob(name=row["image"], ref_count=row["count"]) for row in counts],
+        batch_size=1000,
+    )
+
+
+def drop_ref_count_triggers(apps, schema_editor):
+    """Remove the image blob reference count triggers."""
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.execute(POSTGRESQL_DROP_SQL)
+    elif vendor == "sqlite":
+        for sql in SQLITE_DROP_SQL:
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_imageupload'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageBlob',
+            fields=[
+                ('name', models.CharField(max_length=255, primary_key=True, serialize=False)),
+                ('ref_count', models.IntegerField(default=0, editable=False)),
+                ('created', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=models.ImageField(null=True, storage=core.storage.recipe_image_storage, upload_to=core.models.recipe_image_file_path),
+        ),
+        migrations.AddIndex(
+            model_name='imageblob',
+            index=models.Index(fields=['ref_count'], name='core_imageblob_ref_count_idx'),
+        ),
+        migrations.RunPython(create_ref_count_triggers, drop_ref_count_triggers),
+    ]
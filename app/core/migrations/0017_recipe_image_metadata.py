@@ -0,0 +1,46 @@
+# Generated by Django 4.0.10 on 2026-10-18 20:43
+
+from importlib import import_module
+
+from django.db import migrations, models
+
+
+def restore_sqlite_triggers(apps, schema_editor):
+    """Restore the image reference count triggers lost when SQLite rebuilds core_recipe."""
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    blobs = import_module("core.migrations.0016_imageblob")
+    for sql in blobs.SQLITE_DROP_SQL + blobs.SQLITE_CREATE_SQL:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_imageblob'),
+    ]
+
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop, restore_sqlite_triggers),
+        migrations.AddField(
+            model_name='recipe',
+            name='image_height',
+            field=models.PositiveIntegerField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='image_placeholder',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='image_size',
+            field=models.PositiveBigIntegerField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='image_width',
+            field=models.PositiveIntegerField(editable=False, null=True),
+        ),
+        migrations.RunPython(restore_sqlite_triggers, migrations.RunPython.noop),
+    ]
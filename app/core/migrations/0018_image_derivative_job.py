@@ -0,0 +1,64 @@
+# Generated by Django 4.0.10 on 2026-10-18 21:00
+
+from importlib import import_module
+
+from django.db import migrations, models
+import django.utils.timezone
+
+restore_sqlite_triggers = import_module(
+    "core.migrations.0017_recipe_image_metadata"
+).restore_sqlite_triggers
+
+
+def queue_existing_images(apps, schema_editor):
+    """Queue derivative jobs for the images recipes already use."""
+    Recipe = apps.get_model("core", "Recipe")
+    ImageDerivativeJob = apps.get_model("core", "ImageDerivativeJob")
+    names = (
+        Recipe.objects.exclude(image="")
+        .exclude(image__isnull=True)
+        .values_list("image", flat=True)
+        .distinct()
+        .order_by()
+    )
+    ImageDerivativeJob.objects.bulk_create(
+        [ImageDerivativeJob(name=name) for name in names.iterator()],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_recipe_image_metadata'),
+    ]
+
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop, restore_sqlite_triggers),
+        migrations.CreateModel(
+            name='ImageDerivativeJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('message', models.TextField(blank=True)),
+                ('worker', models.CharField(blank=True, max_length=255)),
+                ('heartbeat', models.DateTimeField(blank=True, null=True)),
+                ('created', models.DateTimeField(default=django.utils.timezone.now)),
+                ('finished', models.DateTimeField(blank=True, null=True)),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('overwrite', models.BooleanField(default=False)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='image_derivatives',
+            field=models.CharField(blank=True, editable=False, max_length=100),
+        ),
+        migrations.AddIndex(
+            model_name='imagederivativejob',
+            index=models.Index(fields=['status', 'id'], name='core_derivativejob_queue_idx'),
+        ),
+        migrations.RunPython(restore_sqlite_triggers, migrations.RunPython.noop),
+        migrations.RunPython(queue_existing_images, migrations.RunPython.noop),
+    ]
@@ -4,38 +4,68 @@ Database models for the application.
 
 import uuid
 import os
+from datetime import timedelta
 
 from django.conf import settings
+from django.contrib.postgres.search import SearchVectorField
+from django.db import connections, transaction
 from django.db.models import (
+    F,
+    Count,
+    OuterRef,
+    Subquery,
+    Manager,
     Model,
     CharField,
     TextField,
     EmailField,
     BooleanField,
     IntegerField,
+    PositiveBigIntegerField,
+    DateTimeField,
+    FileField,
+    JSONField,
+    PositiveIntegerField,
+    Index,
+    Q,
+    UUIDField,
     DecimalField,
     ImageField,
     ForeignKey,
+    OneToOneField,
     ManyToManyField,
+    UniqueConstraint,
     CASCADE,
 )
+from django.db.models.functions import Coalesce, Lower
+from django.utils import timezone
 from django.contrib.auth.models import (
     AbstractBaseUser,
     BaseUserManager,
     PermissionsMixin,
 )
 
+from core.storage import recipe_image_storage
+
 AUTH_USER_MODEL = settings.AUTH_USER_MODEL
 
 
 def recipe_image_file_path(instance, filename):
-    """Generate file path for new recipe image."""
+    """Generate file path for new recipe image, renamed to its digest on save."""
     ext = os.path.splitext(filename)[1]
     filename = f"{uuid.uuid4()}{ext}"
 
     return os.path.join("uploads", "recipe", filename)
 
 
+def import_file_path(instance, filename):
+    """Generate file path for new import file."""
+    ext = os.path.splitext(filename)[1]
+    filename = f"{uuid.uuid4()}{ext}"
+
+    return os.path.join("uploads", "imports", filename)
+
+
 class UserManager(BaseUserManager):
     """User manager for the application."""
 
@@ -104,18 +134,124 @@ class Recipe(Model):
     link = CharField(max_length=255, blank=True)
     tags = ManyToManyField("Tag")
     ingredients = ManyToManyField("Ingredient")
-    image = ImageField(null=True, upload_to=recipe_image_file_path)
+    image = ImageField(
+        null=True, upload_to=recipe_image_file_path, storage=recipe_image_storage
+    )
+    image_width = PositiveIntegerField(null=True, editable=False)
+    image_height = PositiveIntegerField(null=True, editable=False)
+    image_size = PositiveBigIntegerField(null=True, editable=False)
+    image_placeholder = CharField(max_length=64, blank=True, editable=False)
+    # Name of the image whose derivatives have been generated, if any.
+    image_derivatives = CharField(max_length=100, blank=True, editable=False)
+    search_vector = SearchVectorField(null=True, editable=False)
 
     def __str__(self):
         """Return the string representation of the recipe."""
         return self.title
 
 
+class NameManager(Manager):
+    """Manager for user owned objects identified by a case-insensitive name."""
+
+    UPSERT_SQL = """
+    INSERT INTO {table} (user_id, name, recipe_count)
+    SELECT %s, unnest(%s::varchar[]), 0
+    ON CONFLICT (user_id, lower(name)) DO UPDATE SET name = {table}.name
+    RETURNING id, name
+    """
+
+    def get_or_create_names(self, user, names):
+        """
+        Return a mapping of each of `names` to the ID of the user's object.
+
+        Names match existing objects case-insensitively and missing ones are
+        created. On PostgreSQL this is a single `INSERT ... ON CONFLICT`,
+        elsewhere an insert ignoring conflicts followed by a lookup, so
+        concurrent writers resolve to the same rows without retries. Names
+        are inserted in a fixed order, so concurrent upserts lock the rows
+        they share in the same order and cannot deadlock.
+
+        Rows are matched back to `names` in Python, as the database's
+        `LOWER()` may only fold ASCII letters, as SQLite's does.
+        """
+        keys = {}
+        for name in names:
+            keys.setdefault(name.lower(), name)
+        if not keys:
+            return {}
+        inserted = [keys[key] for key in sorted(keys)]
+
+        connection = connections[self.db]
+        if connection.vendor == "postgresql":
+            sql = self.UPSERT_SQL.format(table=self.model._meta.db_table)
+            with connection.cursor() as cursor:
+                cursor.execute(sql, [user.pk, inserted])
+                rows = cursor.fetchall()
+        else:
+            self.bulk_create(
+                [self.model(user=user, name=name) for name in inserted],
+                ignore_conflicts=True,
+            )
+            lookup = self.annotate(key=Lower("name")).filter(
+                Q(name__in=inserted) | Q(key__in=keys), user=user
+            )
+            rows = lookup.values_list("id", "name")
+
+        exact, folded = {}, {}
+        for pk, name in rows:
+            exact[name] = pk
+            folded.setdefault(name.lower(), pk)
+        return {
+            name: exact.get(keys[name.lower()], folded.get(name.lower()))
+            for name in names
+        }
+
+    def recipe_count_subquery(self):
+        """Return an expression counting the recipes linked to each object."""
+        relation = self.model._meta.get_field("recipe")
+        column = relation.field.m2m_reverse_field_name()
+        counts = (
+            relation.through.objects.filter(**{column: OuterRef("pk")})
+            .values(column)
+            .annotate(count=Count("*"))
+            .values("count")
+        )
+        return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+    def reconcile_recipe_counts(self, queryset=None):
+        """
+        Repair `recipe_count` where it drifted and return the rows fixed.
+
+        Counts are part of the API's responses, so the collection versions
+        of the users owning repaired rows are bumped.
+        """
+        queryset = self.all() if queryset is None else queryset
+        actual = self.recipe_count_subquery()
+        drifted = queryset.exclude(recipe_count=actual)
+        with transaction.atomic():
+            users = drifted.values_list("user", flat=True).distinct()
+            CollectionVersion.objects.bump_many(users)
+            return drifted.update(recipe_count=actual)
+
+
 class Tag(Model):
     """Tag model for the application."""
 
     name = CharField(max_length=255)
     user = ForeignKey(AUTH_USER_MODEL, on_delete=CASCADE)
+    recipe_count = IntegerField(default=0, editable=False)
+
+    objects = NameManager()
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(
+                "user", Lower("name"), name="core_tag_user_lower_name_uniq"
+            ),
+        ]
+        indexes = [
+            Index(fields=["user", "recipe_count"], name="core_tag_user_count_idx"),
+        ]
 
     def __str__(self):
         """Return the string representation of the tag."""
@@ -127,7 +263,260 @@ class Ingredient(Model):
 
     name = CharField(max_length=255)
     user = ForeignKey(AUTH_USER_MODEL, on_delete=CASCADE)
+    recipe_count = IntegerField(default=0, editable=False)
+
+    objects = NameManager()
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(
+                "user", Lower("name"), name="core_ingredient_user_lower_name_uniq"
+            ),
+        ]
+        indexes = [
+            Index(
+                fields=["user", "recipe_count"], name="core_ingredient_user_count_idx"
+            ),
+        ]
 
     def __str__(self):
         """Return the string representation of the ingredient."""
         return self.name
+
+
+class CollectionVersionManager(Manager):
+    """Manager for collection versions."""
+
+    def for_user(self, user):
+        """Return the `(version, modified)` of the user's collection."""
+        row = self.filter(user=user).values_list("version", "modified").first()
+        return row or (0, None)
+
+    def bump(self, user):
+        """Record a write to the user's collection."""
+        changes = {"version": F("version") + 1, "modified": timezone.now()}
+        if self.filter(user=user).update(**changes):
+            return
+        _, created = self.get_or_create(user=user, defaults={"version": 1})
+        if not created:
+            self.filter(user=user).update(**changes)
+
+    def bump_many(self, user_ids):
+        """Record a write to the collections of the users `user_ids`."""
+        user_ids = list(user_ids)
+        changes = {"version": F("version") + 1, "modified": timezone.now()}
+        self.filter(user__in=user_ids).update(**changes)
+        self.bulk_create(
+            [self.model(user_id=pk, version=1) for pk in user_ids],
+            ignore_conflicts=True,
+        )
+
+
+class CollectionVersion(Model):
+    """Version of a user's recipes, tags and ingredients, bumped on writes."""
+
+    user = OneToOneField(AUTH_USER_MODEL, on_delete=CASCADE, primary_key=True)
+    version = PositiveBigIntegerField(default=0)
+    modified = DateTimeField(default=timezone.now)
+
+    objects = CollectionVersionManager()
+
+    def __str__(self):
+        """Return the string representation of the collection version."""
+        return f"{self.user_id}:{self.version}"
+
+
+class ImageUploadManager(Manager):
+    """Manager for chunked image uploads."""
+
+    def expired(self):
+        """Return the uploads started more than `CHUNKED_UPLOAD_TTL` seconds ago."""
+        ttl = timedelta(seconds=settings.CHUNKED_UPLOAD_TTL)
+        return self.filter(created__lt=timezone.now() - ttl)
+
+    def active(self):
+        """Return the uploads that have not expired yet."""
+        ttl = timedelta(seconds=settings.CHUNKED_UPLOAD_TTL)
+        return self.filter(created__gte=timezone.now() - ttl)
+
+
+class ImageUpload(Model):
+    """Chunked upload of a recipe image, assembled on disk until finalized."""
+
+    id = UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = ForeignKey(AUTH_USER_MODEL, on_delete=CASCADE)
+    recipe = ForeignKey(Recipe, on_delete=CASCADE)
+    filename = CharField(max_length=255)
+    size = PositiveBigIntegerField()
+    offset = PositiveBigIntegerField(default=0)
+    created = DateTimeField(default=timezone.now)
+
+    objects = ImageUploadManager()
+
+    def __str__(self):
+        """Return the string representation of the upload."""
+        return f"{self.id}:{self.offset}/{self.size}"
+
+
+class ImageBlob(Model):
+    """
+    Recipe image file, stored once and shared by every recipe using it.
+
+    `ref_count` is kept up to date by database triggers on the recipe image
+    column, so files whose count dropped to 0 are no longer used.
+    """
+
+    name = CharField(max_length=255, primary_key=True)
+    ref_count = IntegerField(default=0, editable=False)
+    created = DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [Index(fields=["ref_count"], name="core_imageblob_ref_count_idx")]
+
+    def __str__(self):
+        """Return the string representation of the image blob."""
+        return f"{self.name}:{self.ref_count}"
+
+
+class JobQueueManager(Manager):
+    """Manager for jobs processed by workers sharing the database as a queue."""
+
+    def claim(self, worker, stale_after):
+        """
+        Assign the oldest waiting job to `worker` and return it, or None.
+
+        Jobs locked by another worker's claim are skipped, and running jobs
+        whose heartbeat is older than `stale_after` are taken over, so any
+        number of workers can share the queue through the database.
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            job = (
+                self.select_for_update(skip_locked=True)
+                .filter(
+                    Q(status=QueuedJob.PENDING)
+                    | Q(status=QueuedJob.RUNNING, heartbeat__lt=now - stale_after)
+                )
+                .order_by("id")
+                .first()
+            )
+            if job is None:
+                return None
+            job.status = QueuedJob.RUNNING
+            job.worker = worker
+            job.heartbeat = now
+            job.save(update_fields=["status", "worker", "heartbeat"])
+        return job
+
+
+class QueuedJob(Model):
+    """Base model for jobs claimed and processed by workers."""
+
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (PENDING, "Pending"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    ]
+
+    status = CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    message = TextField(blank=True)
+    worker = CharField(max_length=255, blank=True)
+    heartbeat = DateTimeField(null=True, blank=True)
+    created = DateTimeField(default=timezone.now)
+    finished = DateTimeField(null=True, blank=True)
+
+    objects = JobQueueManager()
+
+    class Meta:
+        abstract = True
+
+    def __str__(self):
+        """Return the string representation of the job."""
+        return f"{self.id}:{self.status}"
+
+
+class ImportJob(QueuedJob):
+    """Recipe import from an uploaded file, processed by a worker."""
+
+    NDJSON = "ndjson"
+    CSV = "csv"
+    FORMAT_CHOICES = [(NDJSON, "NDJSON"), (CSV, "CSV")]
+
+    user = ForeignKey(AUTH_USER_MODEL, on_delete=CASCADE)
+    file = FileField(upload_to=import_file_path)
+    format = CharField(max_length=10, choices=FORMAT_CHOICES)
+    processed_rows = PositiveIntegerField(default=0)
+    created_rows = PositiveIntegerField(default=0)
+    failed_rows = PositiveIntegerField(default=0)
+    errors = JSONField(default=list, blank=True)
+
+    class Meta:
+        indexes = [Index(fields=["status", "id"], name="core_importjob_queue_idx")]
+
+
+class ImageDerivativeJobManager(JobQueueManager):
+    """Manager for image derivative jobs."""
+
+    def enqueue(self, name, overwrite=False):
+        """
+        Queue the derivatives of image `name` and return the job.
+
+        Images are content-addressed, so when the derivatives of `name`
+        were already generated, the recipes using it are marked ready
+        straight away instead. The job row is locked until the caller's
+        transaction ends, so a worker finishing it meanwhile waits and then
+        sees the recipes it has to mark.
+        """
+        with transaction.atomic():
+            job, _ = self.select_for_update().get_or_create(name=name)
+            if job.status == self.model.DONE and not overwrite:
+                self.mark_ready(name)
+            elif job.status == self.model.FAILED or overwrite:
+                job.status = self.model.PENDING
+                job.overwrite = overwrite
+                job.save(update_fields=["status", "overwrite"])
+        return job
+
+    def finish(self, job, message=""):
+        """
+        Record the outcome of a claimed `job`, returning False if it was lost.
+
+        A job taken over by another worker, or queued again while it ran,
+        is left as is. On success, the recipes using the image are marked
+        as having their derivatives generated.
+        """
+        status = self.model.FAILED if message else self.model.DONE
+        changes = {"status": status, "message": message, "finished": timezone.now()}
+        with transaction.atomic():
+            finished = self.filter(
+                id=job.id, worker=job.worker, status=self.model.RUNNING
+            ).update(**changes)
+            if finished and status == self.model.DONE:
+                self.mark_ready(job.name)
+        return bool(finished)
+
+    def mark_ready(self, name):
+        """Mark the recipes using image `name` as having their derivatives."""
+        recipes = Recipe.objects.filter(image=name).exclude(image_derivatives=name)
+        users = recipes.values_list("user", flat=True).distinct()
+        CollectionVersion.objects.bump_many(users)
+        recipes.update(image_derivatives=name)
+
+
+class ImageDerivativeJob(QueuedJob):
+    """Generation of the derivatives of a recipe image, processed by a worker."""
+
+    name = CharField(max_length=255, unique=True)
+    overwrite = BooleanField(default=False)
+
+    objects = ImageDerivativeJobManager()
+
+    class Meta:
+        indexes = [
+            Index(fields=["status", "id"], name="core_derivativejob_queue_idx")
+        ]
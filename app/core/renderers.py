@@ -0,0 +1,54 @@
+"""
+Renderers for the REST API.
+"""
+from rest_framework.renderers import JSONRenderer as BaseJSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+ORJSON_OPTIONS = (
+    orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME if orjson else 0
+)
+
+
+class JSONRenderer(BaseJSONRenderer):
+    """
+    Renderer which serializes to JSON with orjson when it is installed.
+
+    Output matches the stdlib based renderer: values orjson does not handle
+    natively, as well as datetimes, go through the same `encoder_class`.
+    Indented, ASCII only or non compact output, and anything orjson cannot
+    encode, fall back to the stdlib renderer.
+    """
+
+    def _can_use_orjson(self, accepted_media_type, renderer_context):
+        """Return whether the requested output is something orjson produces."""
+        return (
+            orjson is not None
+            and self.compact
+            and not self.ensure_ascii
+            and self.get_indent(accepted_media_type, renderer_context) is None
+        )
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Render `data` into JSON, returning a bytestring."""
+        renderer_context = renderer_context or {}
+        if data is None or not self._can_use_orjson(
+            accepted_media_type, renderer_context
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(
+                data, default=self.encoder_class().default, option=ORJSON_OPTIONS
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Escape \u2028 and \u2029 like the stdlib renderer, so the
+        # output stays a strict javascript subset.
+        return ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+            b"\xe2\x80\xa9", b"\\u2029"
+        )
@@ -0,0 +1,64 @@
+"""
+Content-addressed file storage.
+"""
+import hashlib
+import os
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+
+# Suffix of the files uploads are streamed to before they are named.
+PENDING_SUFFIX = ".pending"
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    File system storage naming each file after the SHA-256 of its content.
+
+    Uploads are hashed while they are streamed to disk, then stored as
+    `<directory>/<digest[:2]>/<digest><ext>`. Identical uploads end up under
+    the same name and are only stored once, and as a name never changes
+    content, its URL can be cached forever.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        """Return `name` as is, the final name is only known once hashed."""
+        return name
+
+    def _save(self, name, content):
+        """Stream `content` to disk and return its content-addressed name."""
+        head, tail = os.path.split(name)
+        ext = os.path.splitext(tail)[1].lower()
+        directory = self.path(head)
+        os.makedirs(directory, exist_ok=True)
+
+        digest = hashlib.sha256()
+        fd, pending = tempfile.mkstemp(dir=directory, suffix=PENDING_SUFFIX)
+        try:
+            with os.fdopen(fd, "wb") as file:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    file.write(chunk)
+            digest = digest.hexdigest()
+            name = os.path.join(head, digest[:2], f"{digest}{ext}")
+            path = self.path(name)
+            try:
+                # Mark an existing copy as new again, so the grace period of
+                # the orphaned image collector covers its new reference.
+                os.utime(path)
+                os.remove(pending)
+            except FileNotFoundError:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                if self.file_permissions_mode is not None:
+                    os.chmod(pending, self.file_permissions_mode)
+                os.replace(pending, path)
+        except BaseException:
+            if os.path.exists(pending):
+                os.remove(pending)
+            raise
+        return name.replace("\\", "/")
+
+
+def recipe_image_storage():
+    """Return the storage of recipe images."""
+    return ContentAddressedStorage()
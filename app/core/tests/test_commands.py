@@ -1,13 +1,27 @@
 """
 Test custom Django management commands.
 """
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
 from unittest.mock import patch
+import json
 
 from psycopg2 import OperationalError as Psycopg2OpError
 
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.management import call_command
 from django.db.utils import OperationalError
-from django.test import SimpleTestCase
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from core.constants.mock_data import john_doe, mock_user
+from core.models import CollectionVersion, ImageDerivativeJob, ImportJob, Recipe, Tag
+from recipe.images import derivative_names
+from recipe.tests.test_images import save_image, delete_image
 
 
 @patch("core.management.commands.wait_for_db.Command.check")
@@ -33,3 +47,139 @@ class CommandTests(SimpleTestCase):
 
         self.assertEqual(patched_check.call_count, 6)
         patched_check.assert_called_with(databases=["default"])
+
+
+class ProcessImportsCommandTests(TestCase):
+    """Test the import worker command."""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings = override_settings(MEDIA_ROOT=media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.user = get_user_model().objects.create_user(**john_doe)
+
+    def create_job(self, **params):
+        """Create an import job of one recipe."""
+        content = json.dumps({"title": "Soup", "time_minutes": 10, "price": "2.50"})
+        file = SimpleUploadedFile("recipes.ndjson", content.encode())
+        return ImportJob.objects.create(
+            user=self.user, file=file, format=ImportJob.NDJSON, **params
+        )
+
+    def test_process_pending_jobs(self):
+        """Test pending jobs are processed until none are left."""
+        jobs = [self.create_job(), self.create_job()]
+
+        call_command("process_imports", "--once", stdout=StringIO())
+
+        for job in jobs:
+            job.refresh_from_db()
+            self.assertEqual(job.status, ImportJob.DONE)
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 2)
+
+    def test_claim_skips_live_jobs(self):
+        """Test running jobs are only taken over once their heartbeat is stale."""
+        stale_after = timedelta(minutes=5)
+        live = self.create_job(
+            status=ImportJob.RUNNING, worker="a", heartbeat=timezone.now()
+        )
+        stale = self.create_job(
+            status=ImportJob.RUNNING,
+            worker="b",
+            heartbeat=timezone.now() - timedelta(minutes=10),
+        )
+
+        job = ImportJob.objects.claim("c", stale_after)
+
+        self.assertEqual(job.id, stale.id)
+        self.assertEqual(job.worker, "c")
+        self.assertIsNone(ImportJob.objects.claim("c", stale_after))
+        live.refresh_from_db()
+        self.assertEqual(live.worker, "a")
+
+
+class ProcessImageDerivativesCommandTests(TestCase):
+    """Test the image derivative worker command."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(**john_doe)
+
+    def test_process_pending_jobs(self):
+        """Test derivatives are generated and the recipes marked ready."""
+        name = save_image()
+        self.addCleanup(delete_image, name)
+        recipe = Recipe.objects.create(
+            user=self.user, title="Soup", time_minutes=10, price="2.50", image=name
+        )
+        ImageDerivativeJob.objects.enqueue(name)
+
+        call_command("process_image_derivatives", "--once", stdout=StringIO())
+
+        job = ImageDerivativeJob.objects.get(name=name)
+        self.assertEqual(job.status, ImageDerivativeJob.DONE)
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.image_derivatives, name)
+        self.assertEqual(CollectionVersion.objects.for_user(self.user)[0], 1)
+        for _, _, path in derivative_names(name):
+            self.assertTrue(default_storage.exists(path), path)
+
+    def test_failed_job(self):
+        """Test a job whose image cannot be read is recorded as failed."""
+        ImageDerivativeJob.objects.enqueue("uploads/recipe/gone.jpg")
+        err = StringIO()
+
+        call_command(
+            "process_image_derivatives", "--once", stdout=StringIO(), stderr=err
+        )
+
+        job = ImageDerivativeJob.objects.get()
+        self.assertEqual(job.status, ImageDerivativeJob.FAILED)
+        self.assertTrue(job.message)
+        self.assertIn("gone.jpg", err.getvalue())
+
+    def test_enqueue_done_image(self):
+        """Test recipes reusing an image with derivatives are ready at once."""
+        ImageDerivativeJob.objects.create(
+            name="uploads/recipe/ab.jpg", status=ImageDerivativeJob.DONE
+        )
+        recipe = Recipe.objects.create(
+            user=self.user,
+            title="Soup",
+            time_minutes=10,
+            price="2.50",
+            image="uploads/recipe/ab.jpg",
+        )
+
+        job = ImageDerivativeJob.objects.enqueue(recipe.image.name)
+
+        self.assertEqual(job.status, ImageDerivativeJob.DONE)
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.image_derivatives, "uploads/recipe/ab.jpg")
+
+
+class ReconcileRecipeCountsCommandTests(TestCase):
+    """Test repairing tag and ingredient recipe counts."""
+
+    def test_reconcile_recipe_counts(self):
+        """Test drifted counts are recomputed from the through tables."""
+        user = get_user_model().objects.create_user(**john_doe)
+        tags = [Tag.objects.create(user=user, name=f"Tag {i}") for i in range(3)]
+        recipe = Recipe.objects.create(
+            user=user, title="Soup", time_minutes=10, price="2.50"
+        )
+        recipe.tags.add(tags[0], tags[1])
+        Tag.objects.filter(id=tags[0].id).update(recipe_count=5)
+        Tag.objects.filter(id=tags[2].id).update(recipe_count=-1)
+        other = get_user_model().objects.create_user(**mock_user())
+        Tag.objects.create(user=other, name="Kept")
+
+        out = StringIO()
+        call_command("reconcile_recipe_counts", "--batch-size", "2", stdout=out)
+
+        counts = dict(Tag.objects.filter(user=user).values_list("id", "recipe_count"))
+        self.assertEqual(counts, {tags[0].id: 1, tags[1].id: 1, tags[2].id: 0})
+        self.assertIn("Tags: 2 counts repaired.", out.getvalue())
+        self.assertGreater(CollectionVersion.objects.for_user(user)[0], 0)
+        self.assertEqual(CollectionVersion.objects.for_user(other)[0], 0)
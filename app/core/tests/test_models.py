@@ -5,11 +5,12 @@ Tests for models.
 from unittest.mock import patch
 from decimal import Decimal
 
+from django.db import IntegrityError
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 
-from core.constants.mock_data import john_doe, mock_user
-from core.models import Recipe, Tag, Ingredient
+from core.constants.mock_data import john_doe, mock_user, mock_recipe
+from core.models import Recipe, Tag, Ingredient, ImageBlob
 from core import models
 
 
@@ -115,6 +116,36 @@ class ModelTests(TestCase):
         self.assertEqual(str(ingredient), ingredient.name)
         self.assertEqual(ingredient.name, "Cucumber")
 
+    def test_tag_names_unique_per_user_ignoring_case(self):
+        """Test a user cannot have two tags differing only by case."""
+        user = create_user(**john_doe)
+        Tag.objects.create(user=user, name="Vegan")
+        Tag.objects.create(user=create_user(**mock_user()), name="vegan")
+
+        with self.assertRaises(IntegrityError):
+            Tag.objects.create(user=user, name="VEGAN")
+
+    def test_get_or_create_names(self):
+        """Test names resolve to existing objects or new ones."""
+        user = create_user(**john_doe)
+        salt = Ingredient.objects.create(user=user, name="Salt")
+
+        ids = Ingredient.objects.get_or_create_names(user, ["salt", "Pepper"])
+
+        self.assertEqual(ids["salt"], salt.id)
+        self.assertEqual(Ingredient.objects.get(id=ids["Pepper"]).name, "Pepper")
+        self.assertEqual(Ingredient.objects.filter(user=user).count(), 2)
+
+    def test_get_or_create_non_ascii_names(self):
+        """Test names outside of ASCII resolve to their objects."""
+        user = create_user(**john_doe)
+
+        ids = Tag.objects.get_or_create_names(user, ["Équipe", "équipe", "Crème"])
+
+        self.assertEqual(ids["Équipe"], ids["équipe"])
+        self.assertEqual(Tag.objects.get(id=ids["Équipe"]).name, "Équipe")
+        self.assertEqual(Tag.objects.get(id=ids["Crème"]).name, "Crème")
+
     @patch("core.models.uuid.uuid4")
     def test_recipe_file_name_uuid(self, mock_uuid):
         """Test that image is saved in the correct location."""
@@ -124,3 +155,18 @@ class ModelTests(TestCase):
 
         expected_path = f"uploads/recipe/{uuid}.jpg"
         self.assertEqual(file_path, expected_path)
+
+    def test_image_blob_ref_counts(self):
+        """Test image blobs count the recipes using them."""
+        user = create_user(**john_doe)
+        r1 = Recipe.objects.create(user=user, image="a.jpg", **mock_recipe())
+        r2 = Recipe.objects.create(user=user, image="a.jpg", **mock_recipe())
+        self.assertEqual(ImageBlob.objects.get(name="a.jpg").ref_count, 2)
+
+        r1.image = "b.jpg"
+        r1.save()
+        r1.save()
+        r2.delete()
+
+        counts = dict(ImageBlob.objects.values_list("name", "ref_count"))
+        self.assertEqual(counts, {"a.jpg": 0, "b.jpg": 1})
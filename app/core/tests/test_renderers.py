@@ -0,0 +1,100 @@
+"""
+Tests for the REST API renderers and parsers.
+"""
+from datetime import datetime, timezone
+from decimal import Decimal
+from io import BytesIO
+from unittest.mock import patch
+import uuid
+
+from django.test import SimpleTestCase
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser as StdlibJSONParser
+from rest_framework.renderers import JSONRenderer as StdlibJSONRenderer
+from rest_framework.utils.serializer_helpers import ReturnList
+
+from core.parsers import JSONParser
+from core.renderers import JSONRenderer
+
+PAYLOAD = {
+    "id": 1,
+    "title": "Crème brûlée \u2028 with \u2029 separators",
+    "price": "5.00",
+    "raw_price": Decimal("4.50"),
+    "created": datetime(2023, 9, 1, 2, 11, 5, 123456, tzinfo=timezone.utc),
+    "day": datetime(2023, 9, 1).date(),
+    "uuid": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+    "tags": ReturnList([{"id": 1, "name": "Dessert"}], serializer=None),
+    "counts": {1: 2},
+    "empty": None,
+}
+
+
+class JSONRendererTests(SimpleTestCase):
+    """Test the JSON renderer."""
+
+    def test_matches_stdlib_output(self):
+        """Test output is byte identical to the stdlib renderer."""
+        self.assertEqual(
+            JSONRenderer().render(PAYLOAD), StdlibJSONRenderer().render(PAYLOAD)
+        )
+
+    def test_none_renders_empty(self):
+        """Test rendering None returns an empty body."""
+        self.assertEqual(JSONRenderer().render(None), b"")
+
+    def test_indent_falls_back(self):
+        """Test indented output uses the stdlib renderer."""
+        media_type = "application/json; indent=4"
+
+        self.assertEqual(
+            JSONRenderer().render(PAYLOAD, media_type),
+            StdlibJSONRenderer().render(PAYLOAD, media_type),
+        )
+
+    def test_unsupported_value_falls_back(self):
+        """Test values orjson cannot encode use the stdlib renderer."""
+        data = {"big": 2**70}
+
+        self.assertEqual(JSONRenderer().render(data), b'{"big":1180591620717411303424}')
+
+    @patch("core.renderers.orjson", None)
+    def test_without_orjson(self):
+        """Test the renderer works when orjson is not installed."""
+        self.assertEqual(
+            JSONRenderer().render(PAYLOAD), StdlibJSONRenderer().render(PAYLOAD)
+        )
+
+
+class JSONParserTests(SimpleTestCase):
+    """Test the JSON parser."""
+
+    body = '{"title": "Crème brûlée", "tags": [{"name": "Dessert"}], "n": 1.5}'
+
+    def test_matches_stdlib_output(self):
+        """Test parsed data matches the stdlib parser."""
+        self.assertEqual(
+            JSONParser().parse(BytesIO(self.body.encode())),
+            StdlibJSONParser().parse(BytesIO(self.body.encode())),
+        )
+
+    def test_invalid_json(self):
+        """Test invalid JSON raises a parse error."""
+        with self.assertRaises(ParseError):
+            JSONParser().parse(BytesIO(b'{"title": '))
+
+    def test_non_utf8_encoding(self):
+        """Test bodies in other encodings use the stdlib parser."""
+        data = JSONParser().parse(
+            BytesIO(self.body.encode("latin-1")), parser_context={"encoding": "latin-1"}
+        )
+
+        self.assertEqual(data["title"], "Crème brûlée")
+
+    @patch("core.parsers.orjson", None)
+    def test_without_orjson(self):
+        """Test the parser works when orjson is not installed."""
+        data = JSONParser().parse(BytesIO(self.body.encode()))
+
+        self.assertEqual(data["tags"], [{"name": "Dessert"}])
@@ -0,0 +1,44 @@
+"""
+Tests for content-addressed storage.
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+
+from django.core.files.base import ContentFile
+from django.test import SimpleTestCase
+
+from core.storage import ContentAddressedStorage
+
+
+class ContentAddressedStorageTests(SimpleTestCase):
+    """Test storing files under the digest of their content."""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.storage = ContentAddressedStorage(location=self.root)
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def test_file_named_after_digest(self):
+        """Test files are stored under the SHA-256 of their content."""
+        digest = hashlib.sha256(b"image").hexdigest()
+
+        name = self.storage.save("uploads/recipe/photo.JPG", ContentFile(b"image"))
+
+        self.assertEqual(name, f"uploads/recipe/{digest[:2]}/{digest}.jpg")
+        with self.storage.open(name) as file:
+            self.assertEqual(file.read(), b"image")
+
+    def test_identical_files_stored_once(self):
+        """Test saving the same content twice reuses the stored file."""
+        first = self.storage.save("uploads/recipe/a.jpg", ContentFile(b"image"))
+        second = self.storage.save("uploads/recipe/b.jpg", ContentFile(b"image"))
+        other = self.storage.save("uploads/recipe/c.jpg", ContentFile(b"other"))
+
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+        files = [f for _, _, names in os.walk(self.root) for f in names]
+        self.assertEqual(len(files), 2)
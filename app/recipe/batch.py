@@ -0,0 +1,158 @@
+"""
+Batch write paths for the recipe APIs.
+"""
+from django.db import transaction
+
+from core.models import Recipe, CollectionVersion
+from recipe.serializers import RecipeBatchItemSerializer, related_ids, through_columns
+
+RELATIONS = ["tags", "ingredients"]
+
+CREATED = "created"
+UPDATED = "updated"
+INVALID = "invalid"
+
+
+class RecipeBatchWriter:
+    """
+    Create and update many recipes of one user at once.
+
+    Items are validated one by one, then every valid item is written in a
+    single transaction: tag and ingredient names of the whole batch are
+    resolved with one lookup and one insert per relation, and recipes and
+    their through rows are written with `bulk_create` and `bulk_update`.
+    Items with an `id` update that recipe, locked for the transaction,
+    and only the fields they set; the others create a new one.
+    """
+
+    def __init__(self, user):
+        self.user = user
+
+    def _validate(self, items):
+        """Return `(valid, errors)` for `items`, both keyed by item index."""
+        valid, errors = {}, {}
+        for index, item in enumerate(items):
+            partial = isinstance(item, dict) and "id" in item
+            serializer = RecipeBatchItemSerializer(data=item, partial=partial)
+            if serializer.is_valid():
+                valid[index] = dict(serializer.validated_data)
+            else:
+                errors[index] = serializer.errors
+        return valid, errors
+
+    def _lock(self, valid, errors):
+        """
+        Lock the recipes `valid` items update and return them by ID.
+
+        Items updating a missing recipe, or one an earlier item updates,
+        are moved from `valid` to `errors`. Rows are locked in ID order, so
+        concurrent batches cannot deadlock on them.
+        """
+        ids = [data["id"] for data in valid.values() if "id" in data]
+        queryset = Recipe.objects.select_for_update().filter(user=self.user, id__in=ids)
+        recipes = {recipe.id: recipe for recipe in queryset.order_by("id")}
+        seen = set()
+        for index, data in list(valid.items()):
+            if "id" not in data:
+                continue
+            if data["id"] not in recipes:
+                errors[index] = {"id": ["Not found."]}
+            elif data["id"] in seen:
+                errors[index] = {"id": ["Duplicate ID in batch."]}
+            else:
+                seen.add(data["id"])
+                continue
+            del valid[index]
+        return recipes
+
+    def _link(self, name, links, replaced):
+        """
+        Write the through rows of relation `name`.
+
+        `links` maps recipe IDs to the wanted related IDs. Recipes in
+        `replaced` already exist, so only the difference with their current
+        through rows is written.
+        """
+        through, source, target = through_columns(name)
+        current = {}
+        remove = []
+        if replaced:
+            rows = through.objects.filter(**{f"{source}__in": replaced}).values_list(
+                "id", source, target
+            )
+            for pk, recipe_id, related_id in rows:
+                if related_id in links[recipe_id]:
+                    current.setdefault(recipe_id, set()).add(related_id)
+                else:
+                    remove.append(pk)
+        if remove:
+            through.objects.filter(id__in=remove).delete()
+
+        add = [
+            through(**{source: recipe_id, target: related_id})
+            for recipe_id, wanted in links.items()
+            for related_id in wanted
+            if related_id not in current.get(recipe_id, ())
+        ]
+        if add:
+            through.objects.bulk_create(add, ignore_conflicts=True)
+
+    def write(self, items):
+        """Write `items` and return one result per item, in order."""
+        valid, errors = self._validate(items)
+
+        with transaction.atomic():
+            recipes = self._lock(valid, errors)
+            related = {}
+            for name in RELATIONS:
+                names = [
+                    item["name"]
+                    for data in valid.values()
+                    for item in data.get(name, [])
+                ]
+                related[name] = related_ids(name, names, self.user)
+
+            created, updated, groups = {}, {}, {}
+            for index, data in valid.items():
+                scalars = {k: v for k, v in data.items() if k not in RELATIONS}
+                pk = scalars.pop("id", None)
+                if pk is None:
+                    created[index] = Recipe(user=self.user, **scalars)
+                    continue
+                recipe = recipes[pk]
+                for attr, value in scalars.items():
+                    setattr(recipe, attr, value)
+                updated[index] = recipe
+                if scalars:
+                    groups.setdefault(tuple(sorted(scalars)), []).append(recipe)
+
+            if created:
+                Recipe.objects.bulk_create(created.values())
+            # Each item only writes its own fields, grouped by field set.
+            for fields, group in groups.items():
+                Recipe.objects.bulk_update(group, fields)
+
+            for name in RELATIONS:
+                links, replaced = {}, []
+                for index, recipe in {**created, **updated}.items():
+                    if name not in valid[index]:
+                        continue
+                    ids = related[name]
+                    links[recipe.id] = {ids[i["name"]] for i in valid[index][name]}
+                    if index in updated:
+                        replaced.append(recipe.id)
+                if links:
+                    self._link(name, links, replaced)
+
+            if valid:
+                CollectionVersion.objects.bump(self.user)
+
+        results = []
+        for index in range(len(items)):
+            if index in errors:
+                results.append({"status": INVALID, "errors": errors[index]})
+            elif index in created:
+                results.append({"status": CREATED, "id": created[index].id})
+            else:
+                results.append({"status": UPDATED, "id": updated[index].id})
+        return results
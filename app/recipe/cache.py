@@ -0,0 +1,58 @@
+"""
+Response cache for the recipe APIs.
+"""
+from hashlib import sha1
+
+from django.core.cache import caches
+
+CACHE_ALIAS = "api"
+KEY_PREFIX = "recipe-api"
+HITS = "hits"
+MISSES = "misses"
+
+
+def get_cache():
+    """Return the cache backend used for API responses."""
+    return caches[CACHE_ALIAS]
+
+
+def normalize_params(query_params, list_params=()):
+    """
+    Return a canonical string for `query_params`.
+
+    Parameters are sorted. Values of `list_params` are comma separated lists
+    whose order does not matter, so their items are sorted and deduplicated
+    too. Blank values are kept, as a blank `fields` selects no field at all.
+    """
+    items = []
+    for name, values in sorted(query_params.lists()):
+        for value in sorted(values):
+            value = value.strip()
+            if name in list_params:
+                value = ",".join(sorted({v.strip() for v in value.split(",")} - {""}))
+            items.append(f"{name}={value}")
+    return "&".join(items)
+
+
+def make_key(user, version, modified, path, params, format):
+    """Return the cache key of a response for a collection version."""
+    digest = sha1(f"{path}?{params}".encode()).hexdigest()
+    stamp = modified.timestamp()
+    return f"{KEY_PREFIX}:{user.pk}:{version}:{stamp}:{format}:{digest}"
+
+
+def record(event):
+    """Increment the `event` counter."""
+    cache = get_cache()
+    key = f"{KEY_PREFIX}:stats:{event}"
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, timeout=None)
+
+
+def stats():
+    """Return the hit and miss counters."""
+    values = get_cache().get_many([f"{KEY_PREFIX}:stats:{e}" for e in [HITS, MISSES]])
+    return {e: values.get(f"{KEY_PREFIX}:stats:{e}", 0) for e in [HITS, MISSES]}
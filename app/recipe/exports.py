@@ -0,0 +1,81 @@
+"""
+Streaming exports for the recipe APIs.
+"""
+import csv
+from itertools import islice
+
+from core.renderers import JSONRenderer
+from recipe.readers import RecipeListReader, RELATION_FIELDS
+from recipe.serializers import RecipeDetailSerializer
+
+EXPORT_CHUNK_SIZE = 500
+EXPORT_FIELDS = [
+    "id",
+    "title",
+    "description",
+    "time_minutes",
+    "price",
+    "link",
+    "tags",
+    "ingredients",
+]
+CSV_LIST_SEPARATOR = "|"
+
+NDJSON = "ndjson"
+CSV = "csv"
+EXPORT_FORMATS = {NDJSON: "application/x-ndjson", CSV: "text/csv"}
+
+
+class Echo:
+    """File-like object that returns what is written to it."""
+
+    def write(self, value):
+        return value
+
+
+class RecipeExporter:
+    """
+    Stream recipes as NDJSON or CSV.
+
+    Recipes are read as value rows through a server-side cursor, `chunk_size`
+    at a time, and the tags and ingredients of each chunk are loaded with
+    one query per relation, so memory use does not grow with the export.
+    """
+
+    def __init__(self, chunk_size=None):
+        self.chunk_size = chunk_size or EXPORT_CHUNK_SIZE
+        self.reader = RecipeListReader(
+            fields=EXPORT_FIELDS,
+            expand=list(RELATION_FIELDS),
+            serializer_class=RecipeDetailSerializer,
+        )
+
+    def items(self, queryset):
+        """Yield the serialized recipes of `queryset`."""
+        rows = self.reader.values(queryset).iterator(chunk_size=self.chunk_size)
+        while True:
+            chunk = list(islice(rows, self.chunk_size))
+            if not chunk:
+                return
+            yield from self.reader.serialize(chunk)
+
+    def ndjson(self, queryset):
+        """Yield one JSON document per recipe, each on its own line."""
+        renderer = JSONRenderer()
+        for item in self.items(queryset):
+            yield renderer.render(item) + b"\n"
+
+    def csv(self, queryset):
+        """Yield a CSV header and one row per recipe."""
+        writer = csv.writer(Echo())
+        yield writer.writerow(EXPORT_FIELDS)
+        for item in self.items(queryset):
+            for name in RELATION_FIELDS:
+                item[name] = CSV_LIST_SEPARATOR.join(r["name"] for r in item[name])
+            yield writer.writerow([item[name] for name in EXPORT_FIELDS])
+
+    def stream(self, export_format, queryset):
+        """Yield `queryset` in `export_format`."""
+        if export_format == CSV:
+            return self.csv(queryset)
+        return self.ndjson(queryset)
@@ -0,0 +1,81 @@
+"""
+Filters for the recipe APIs.
+"""
+from django.db.models import Exists, OuterRef
+
+from rest_framework.exceptions import ValidationError
+
+MATCH_ANY = "any"
+MATCH_ALL = "all"
+MATCH_CHOICES = [MATCH_ANY, MATCH_ALL]
+
+
+class RelationFilter:
+    """
+    Filter recipes by a many-to-many relation.
+
+    The query parameter holds comma separated IDs. Plain IDs are included
+    and IDs prefixed with `-` are excluded. Included IDs match any of the
+    given IDs by default, or all of them when `<param>_match=all` is set.
+    Every condition compiles to an EXISTS subquery against the through
+    table, so matching recipes are never duplicated and no DISTINCT is
+    needed.
+    """
+
+    def __init__(self, field_name):
+        self.field_name = field_name
+
+    @property
+    def match_param(self):
+        """Return the name of the match mode query parameter."""
+        return f"{self.field_name}_match"
+
+    def _parse_ids(self, value):
+        """Split a parameter value into included and excluded IDs."""
+        include, exclude = [], []
+        for item in value.split(","):
+            item = item.strip()
+            if not item:
+                continue
+            target = exclude if item.startswith("-") else include
+            try:
+                target.append(int(item.lstrip("-")))
+            except ValueError:
+                raise ValidationError(
+                    {self.field_name: f"'{item}' is not a valid ID."}
+                )
+        return list(dict.fromkeys(include)), list(dict.fromkeys(exclude))
+
+    def _exists(self, queryset, ids):
+        """Return an EXISTS subquery for recipes linked to any of `ids`."""
+        field = queryset.model._meta.get_field(self.field_name)
+        through = field.remote_field.through
+        return Exists(
+            through.objects.filter(
+                **{
+                    field.m2m_field_name(): OuterRef("pk"),
+                    f"{field.m2m_reverse_field_name()}__in": ids,
+                }
+            )
+        )
+
+    def filter_queryset(self, query_params, queryset):
+        """Apply the filter described by `query_params` to `queryset`."""
+        value = query_params.get(self.field_name)
+        if not value:
+            return queryset
+        match = query_params.get(self.match_param, MATCH_ANY)
+        if match not in MATCH_CHOICES:
+            raise ValidationError(
+                {self.match_param: f"Must be one of {', '.join(MATCH_CHOICES)}."}
+            )
+
+        include, exclude = self._parse_ids(value)
+        if include and match == MATCH_ALL:
+            for pk in include:
+                queryset = queryset.filter(self._exists(queryset, [pk]))
+        elif include:
+            queryset = queryset.filter(self._exists(queryset, include))
+        if exclude:
+            queryset = queryset.filter(~self._exists(queryset, exclude))
+        return queryset
@@ -0,0 +1,171 @@
+"""
+Image derivatives for recipe uploads.
+"""
+import io
+import math
+import os
+
+from PIL import Image, ImageOps
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+# Bounding box, in pixels, of each derivative size.
+DERIVATIVE_SIZES = {"thumb": 160, "small": 480, "large": 1200}
+# Pillow format, file extension and save options of each derivative format.
+DERIVATIVE_FORMATS = {
+    "jpeg": ("JPEG", "jpg", {"quality": 85, "optimize": True, "progressive": True}),
+    "webp": ("WEBP", "webp", {"quality": 80, "method": 4}),
+}
+
+# Components of the placeholder along each axis, and the size, in pixels,
+# images are reduced to before encoding it.
+PLACEHOLDER_COMPONENTS = (4, 3)
+PLACEHOLDER_SAMPLE_SIZE = 32
+# EXIF orientation tag, and the orientations rotating the image by 90 degrees.
+ORIENTATION = 0x0112
+TRANSPOSED_ORIENTATIONS = {5, 6, 7, 8}
+BASE83 = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz#$%*+,-.:;=?@[]^_{|}~"
+
+
+def derivative_names(name):
+    """Yield `(size, format, name)` for each derivative of image `name`."""
+    head, tail = os.path.split(name)
+    stem = os.path.splitext(tail)[0]
+    for size in DERIVATIVE_SIZES:
+        for fmt, (_, ext, _) in DERIVATIVE_FORMATS.items():
+            yield size, fmt, os.path.join(head, "derivatives", f"{stem}-{size}.{ext}")
+
+
+def generate_derivatives(name, overwrite=True):
+    """
+    Write every derivative of image `name` and return their names.
+
+    The image is rotated according to its EXIF orientation, and derivatives
+    are saved without any of the original's metadata. Existing derivatives
+    are kept unless `overwrite` is set.
+    """
+    todo = [
+        (size, fmt, path)
+        for size, fmt, path in derivative_names(name)
+        if overwrite or not default_storage.exists(path)
+    ]
+    if not todo:
+        return []
+
+    with default_storage.open(name, "rb") as file:
+        with Image.open(file) as original:
+            image = ImageOps.exif_transpose(original)
+            image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+
+    written = []
+    for size, fmt, path in todo:
+        derivative = image.copy()
+        derivative.thumbnail((DERIVATIVE_SIZES[size],) * 2, Image.Resampling.LANCZOS)
+        pil_format, _, options = DERIVATIVE_FORMATS[fmt]
+        if pil_format == "JPEG" and derivative.mode != "RGB":
+            derivative = derivative.convert("RGB")
+        buffer = io.BytesIO()
+        derivative.save(buffer, pil_format, **options)
+        if default_storage.exists(path):
+            default_storage.delete(path)
+        written.append(default_storage.save(path, ContentFile(buffer.getvalue())))
+    return written
+
+
+def _base83(value, length):
+    """Encode `value` as `length` base 83 digits."""
+    return "".join(BASE83[value // 83 ** (length - i - 1) % 83] for i in range(length))
+
+
+def _linear(value):
+    """Convert an sRGB channel value to linear RGB."""
+    value = value / 255
+    return value / 12.92 if value <= 0.04045 else ((value + 0.055) / 1.055) ** 2.4
+
+
+def _srgb(value):
+    """Convert a linear RGB channel value to sRGB."""
+    value = max(0, min(1, value))
+    if value <= 0.0031308:
+        return int(value * 12.92 * 255 + 0.5)
+    return int((1.055 * value ** (1 / 2.4) - 0.055) * 255 + 0.5)
+
+
+def _quantise(value):
+    """Quantise an AC component scaled to [-1, 1] into 19 levels."""
+    value = math.copysign(abs(value) ** 0.5, value)
+    return max(0, min(18, math.floor(value * 9 + 9.5)))
+
+
+def placeholder(image, components=PLACEHOLDER_COMPONENTS):
+    """
+    Return the BlurHash of `image`.
+
+    This short string is decoded by clients into a blurred preview shown
+    while the image loads.
+    """
+    sample = image.convert("RGB")
+    sample.thumbnail((PLACEHOLDER_SAMPLE_SIZE,) * 2)
+    width, height = sample.size
+    linear = [_linear(value) for value in range(256)]
+    data = sample.tobytes()
+    pixels = [
+        (linear[data[k]], linear[data[k + 1]], linear[data[k + 2]])
+        for k in range(0, len(data), 3)
+    ]
+
+    factors = []
+    nx, ny = components
+    for j in range(ny):
+        cos_y = [math.cos(math.pi * j * y / height) for y in range(height)]
+        for i in range(nx):
+            cos_x = [math.cos(math.pi * i * x / width) for x in range(width)]
+            total = [0.0, 0.0, 0.0]
+            for index, pixel in enumerate(pixels):
+                y, x = divmod(index, width)
+                basis = cos_y[y] * cos_x[x]
+                for c in range(3):
+                    total[c] += basis * pixel[c]
+            scale = (1 if i == j == 0 else 2) / (width * height)
+            factors.append([value * scale for value in total])
+
+    dc, ac = factors[0], factors[1:]
+    result = _base83(nx - 1 + (ny - 1) * 9, 1)
+    maximum = max((abs(value) for factor in ac for value in factor), default=0)
+    quantised = max(0, min(82, int(maximum * 166 - 0.5)))
+    maximum = (quantised + 1) / 166
+    result += _base83(quantised, 1)
+    result += _base83((_srgb(dc[0]) << 16) + (_srgb(dc[1]) << 8) + _srgb(dc[2]), 4)
+    for factor in ac:
+        r, g, b = (_quantise(value / maximum) for value in factor)
+        result += _base83(r * 19 * 19 + g * 19 + b, 2)
+    return result
+
+
+def image_metadata(file):
+    """
+    Return the recipe metadata fields of uploaded image `file`.
+
+    Dimensions are those of the image as displayed, after its EXIF
+    rotation. JPEGs are decoded at a reduced scale for the placeholder,
+    which is left empty when the image data cannot be decoded, as with a
+    truncated file whose header is intact.
+    """
+    file.seek(0)
+    with Image.open(file) as original:
+        width, height = original.size
+        if original.getexif().get(ORIENTATION) in TRANSPOSED_ORIENTATIONS:
+            width, height = height, width
+        original.draft("RGB", (PLACEHOLDER_SAMPLE_SIZE * 2,) * 2)
+        try:
+            blurhash = placeholder(ImageOps.exif_transpose(original))
+        except (OSError, Image.DecompressionBombError):
+            blurhash = ""
+    file.seek(0)
+    return {
+        "image_width": width,
+        "image_height": height,
+        "image_size": file.size,
+        "image_placeholder": blurhash,
+    }
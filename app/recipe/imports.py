@@ -0,0 +1,134 @@
+"""
+Background import of recipes from uploaded files.
+"""
+import csv
+import io
+import json
+from itertools import islice
+
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import ImportJob
+from recipe.batch import RecipeBatchWriter, INVALID
+from recipe.exports import CSV_LIST_SEPARATOR
+from recipe.readers import RELATION_FIELDS
+
+IMPORT_BATCH_SIZE = 500
+IMPORT_MAX_ERRORS = 1000
+
+
+class ClaimLost(Exception):
+    """Raised when another worker took over the job being processed."""
+
+
+class RecipeImporter:
+    """
+    Create the recipes of an import job in batches.
+
+    Each batch goes through `RecipeBatchWriter` and is committed together
+    with the job's progress, so a job resumed by another worker continues
+    after the last committed row without creating duplicates. The uploaded
+    file is deleted once the job is done or failed.
+    """
+
+    def __init__(self, job, worker, batch_size=None):
+        self.job = job
+        self.worker = worker
+        self.batch_size = batch_size or IMPORT_BATCH_SIZE
+
+    def _ndjson_rows(self, lines):
+        """Yield `(item, error)` for each non blank line of an NDJSON file."""
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line), None
+            except ValueError as exc:
+                yield None, {"non_field_errors": [f"Invalid JSON: {exc}"]}
+
+    def _csv_rows(self, lines):
+        """Yield `(item, error)` for each row of a CSV file."""
+        for row in csv.DictReader(lines):
+            for name in RELATION_FIELDS:
+                names = (row.get(name) or "").split(CSV_LIST_SEPARATOR)
+                row[name] = [{"name": n.strip()} for n in names if n.strip()]
+            yield row, None
+
+    def rows(self):
+        """Yield `(row_number, item, error)` for each row of the job's file."""
+        self.job.file.open("rb")
+        lines = io.TextIOWrapper(self.job.file, encoding="utf-8-sig", newline="")
+        if self.job.format == ImportJob.CSV:
+            rows = self._csv_rows(lines)
+        else:
+            rows = self._ndjson_rows(lines)
+        for number, (item, error) in enumerate(rows, start=1):
+            if isinstance(item, dict):
+                item.pop("id", None)
+            yield number, item, error
+
+    def _save_progress(self, **changes):
+        """Save `changes` to the job unless another worker claimed it."""
+        changes["heartbeat"] = timezone.now()
+        updated = ImportJob.objects.filter(
+            id=self.job.id, worker=self.worker, status=ImportJob.RUNNING
+        ).update(**changes)
+        if not updated:
+            raise ClaimLost(self.job.id)
+        for name, value in changes.items():
+            setattr(self.job, name, value)
+
+    def _write_batch(self, writer, batch):
+        """Create the recipes of `batch` and record the job's progress."""
+        job = self.job
+        items = [item for _, item, error in batch if error is None]
+        errors = list(job.errors)
+        created = failed = 0
+        with transaction.atomic():
+            results = iter(writer.write(items))
+            for number, _, error in batch:
+                if error is None:
+                    result = next(results)
+                    if result["status"] != INVALID:
+                        created += 1
+                        continue
+                    error = result["errors"]
+                failed += 1
+                if len(errors) < IMPORT_MAX_ERRORS:
+                    errors.append({"row": number, "errors": error})
+
+            self._save_progress(
+                processed_rows=job.processed_rows + len(batch),
+                created_rows=job.created_rows + created,
+                failed_rows=job.failed_rows + failed,
+                errors=errors,
+            )
+
+    def _finish(self, **changes):
+        """Record the job's final state, then delete its file."""
+        name = self.job.file.name
+        self._save_progress(file="", finished=timezone.now(), **changes)
+        if name:
+            self.job.file.storage.delete(name)
+
+    def run(self):
+        """Process the job's remaining rows, then mark it done or failed."""
+        writer = RecipeBatchWriter(self.job.user)
+        file = self.job.file
+        try:
+            try:
+                rows = islice(self.rows(), self.job.processed_rows, None)
+                while True:
+                    batch = list(islice(rows, self.batch_size))
+                    if not batch:
+                        break
+                    self._write_batch(writer, batch)
+            finally:
+                file.close()
+        except ClaimLost:
+            raise
+        except Exception as exc:
+            self._finish(status=ImportJob.FAILED, message=str(exc))
+            raise
+        self._finish(status=ImportJob.DONE)
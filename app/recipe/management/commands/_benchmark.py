@@ -0,0 +1,99 @@
+"""
+Shared helpers for recipe benchmark commands.
+"""
+import random
+import time
+import uuid
+from abc import ABC, abstractmethod
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.constants.constants import recipe_titles, recipe_descriptions
+from core.models import Recipe, Tag, Ingredient
+
+
+class BenchmarkCommand(ABC, BaseCommand):
+    """
+    Base command that seeds throwaway data and times callables against it.
+
+    Everything runs inside a transaction that is rolled back, so the
+    benchmark leaves the database untouched. Subclasses implement `run`.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument("--recipes", type=int, default=1000)
+        parser.add_argument("--tags", type=int, default=50)
+        parser.add_argument("--ingredients", type=int, default=200)
+        parser.add_argument("--per-recipe", type=int, default=5)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def seed(self, options):
+        """Create a user with recipes, tags and ingredients and return it."""
+        rng = random.Random(options["seed"])
+        salt = uuid.uuid4().hex[:12]
+        user = get_user_model().objects.create_user(
+            email=f"bench-{salt}@example.com",
+            username=f"bench-{salt}",
+        )
+        tags = Tag.objects.bulk_create(
+            Tag(user=user, name=f"tag-{i}") for i in range(options["tags"])
+        )
+        ingredients = Ingredient.objects.bulk_create(
+            Ingredient(user=user, name=f"ingredient-{i}")
+            for i in range(options["ingredients"])
+        )
+        recipes = Recipe.objects.bulk_create(
+            Recipe(
+                user=user,
+                title=rng.choice(recipe_titles),
+                description=rng.choice(recipe_descriptions),
+                time_minutes=rng.randrange(5, 120),
+                price=Decimal(rng.randrange(100, 9999)) / 100,
+            )
+            for _ in range(options["recipes"])
+        )
+        per_recipe = options["per_recipe"]
+        Recipe.tags.through.objects.bulk_create(
+            Recipe.tags.through(recipe_id=recipe.id, tag_id=tag.id)
+            for recipe in recipes
+            for tag in rng.sample(tags, min(per_recipe, len(tags)))
+        )
+        Recipe.ingredients.through.objects.bulk_create(
+            Recipe.ingredients.through(recipe_id=recipe.id, ingredient_id=item.id)
+            for recipe in recipes
+            for item in rng.sample(ingredients, min(per_recipe, len(ingredients)))
+        )
+        return user
+
+    def timed(self, func, repeat):
+        """Return the best wall clock time of `repeat` calls to `func`."""
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+
+    def report(self, label, baseline, candidate):
+        """Write one comparison line to stdout."""
+        speedup = baseline / candidate if candidate else float("inf")
+        self.stdout.write(
+            f"{label:<32} baseline {baseline * 1000:9.2f} ms  "
+            f"candidate {candidate * 1000:9.2f} ms  x{speedup:.2f}"
+        )
+
+    def handle(self, *args, **options):
+        """Seed data, run the benchmark and roll everything back."""
+        with transaction.atomic():
+            user = self.seed(options)
+            self.run(user, options)
+            transaction.set_rollback(True)
+
+    @abstractmethod
+    def run(self, user, options):
+        """Run the benchmark for `user`."""
@@ -0,0 +1,74 @@
+"""
+Django command to queue the derivatives of existing recipe images.
+"""
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.models import CollectionVersion, ImageDerivativeJob, Recipe
+from recipe.images import image_metadata
+
+
+class Command(BaseCommand):
+    """
+    Django command to backfill recipe image derivatives and metadata.
+
+    A derivative job is queued for each image, streamed from the database
+    so memory does not grow with the number of images. The jobs are run by
+    `process_image_derivatives` workers.
+
+    Images uploaded before their metadata was recorded are read here, and
+    the dimensions, size and placeholder of the recipes using them filled in.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--overwrite",
+            action="store_true",
+            help="Regenerate derivatives that already exist.",
+        )
+
+    def image_names(self, recipes):
+        """Yield the distinct image names of `recipes`."""
+        return (
+            recipes.exclude(image="")
+            .exclude(image__isnull=True)
+            .order_by("image")
+            .values_list("image", flat=True)
+            .distinct()
+            .iterator()
+        )
+
+    def backfill_metadata(self):
+        """Fill in missing image metadata, returning the images done and failed."""
+        done = failed = 0
+        missing = Recipe.objects.filter(image_width__isnull=True)
+        for name in self.image_names(missing):
+            try:
+                with default_storage.open(name, "rb") as file:
+                    metadata = image_metadata(file)
+            except Exception as exc:
+                failed += 1
+                self.stderr.write(f"{name}: {exc}")
+                continue
+            with transaction.atomic():
+                recipes = missing.filter(image=name)
+                users = recipes.values_list("user", flat=True).distinct()
+                CollectionVersion.objects.bump_many(users)
+                recipes.update(**metadata)
+            done += 1
+        return done, failed
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        queued = 0
+        for name in self.image_names(Recipe.objects.all()):
+            job = ImageDerivativeJob.objects.enqueue(name, options["overwrite"])
+            queued += job.status == ImageDerivativeJob.PENDING
+        done, failed = self.backfill_metadata()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{queued} images queued, metadata of {done} images filled in, "
+                f"{failed} failed."
+            )
+        )
@@ -0,0 +1,38 @@
+"""
+Django command to benchmark the JSON renderer and parser.
+"""
+from io import BytesIO
+
+from rest_framework.parsers import JSONParser as StdlibJSONParser
+from rest_framework.renderers import JSONRenderer as StdlibJSONRenderer
+
+from core.models import Recipe
+from core.parsers import JSONParser
+from core.renderers import JSONRenderer
+from recipe.management.commands._benchmark import BenchmarkCommand
+from recipe.readers import RecipeListReader
+
+
+class Command(BenchmarkCommand):
+    """Compare the orjson renderer and parser with the stdlib ones."""
+
+    help = __doc__
+
+    def run(self, user, options):
+        reader = RecipeListReader()
+        queryset = Recipe.objects.filter(user=user).order_by("-id")
+        data = {"next": None, "previous": None}
+        data["results"] = reader.serialize(list(reader.values(queryset)))
+        body = StdlibJSONRenderer().render(data)
+        repeat = options["repeat"]
+
+        self.report(
+            f"render {len(data['results'])} recipes",
+            self.timed(lambda: StdlibJSONRenderer().render(data), repeat),
+            self.timed(lambda: JSONRenderer().render(data), repeat),
+        )
+        self.report(
+            f"parse {len(body)} bytes",
+            self.timed(lambda: StdlibJSONParser().parse(BytesIO(body)), repeat),
+            self.timed(lambda: JSONParser().parse(BytesIO(body)), repeat),
+        )
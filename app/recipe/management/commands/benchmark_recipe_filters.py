@@ -0,0 +1,75 @@
+"""
+Django command to benchmark recipe tag and ingredient filters.
+"""
+from django.http import QueryDict
+
+from core.models import Recipe, Tag, Ingredient
+from recipe.filters import RelationFilter
+from recipe.management.commands._benchmark import BenchmarkCommand
+
+
+class Command(BenchmarkCommand):
+    """Compare the EXISTS filter engine with the legacy join and DISTINCT."""
+
+    help = __doc__
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument("--filter-ids", type=int, default=3)
+        parser.add_argument("--page-size", type=int, default=50)
+
+    def legacy(self, user, tag_ids, ingredient_ids):
+        """Return the queryset shape used before the filter engine."""
+        queryset = Recipe.objects.all()
+        if tag_ids:
+            queryset = queryset.filter(tags__id__in=tag_ids)
+        if ingredient_ids:
+            queryset = queryset.filter(ingredients__id__in=ingredient_ids)
+        return queryset.filter(user=user).order_by("-id").distinct()
+
+    def engine(self, user, params):
+        """Return the queryset built by the filter engine."""
+        query_params = QueryDict(mutable=True)
+        query_params.update(params)
+        queryset = Recipe.objects.filter(user=user)
+        for name in ["tags", "ingredients"]:
+            queryset = RelationFilter(name).filter_queryset(query_params, queryset)
+        return queryset.order_by("-id")
+
+    def run(self, user, options):
+        count = options["filter_ids"]
+        tag_ids = list(
+            Tag.objects.filter(user=user).values_list("id", flat=True)[:count]
+        )
+        ingredient_ids = list(
+            Ingredient.objects.filter(user=user).values_list("id", flat=True)[:count]
+        )
+        tags = ",".join(map(str, tag_ids))
+        ingredients = ",".join(map(str, ingredient_ids))
+        page = options["page_size"]
+        repeat = options["repeat"]
+
+        scenarios = [
+            ("tags any", self.legacy(user, tag_ids, None), {"tags": tags}),
+            (
+                "tags + ingredients any",
+                self.legacy(user, tag_ids, ingredient_ids),
+                {"tags": tags, "ingredients": ingredients},
+            ),
+        ]
+        for label, legacy, params in scenarios:
+            engine = self.engine(user, params)
+            for suffix, limit in [("page", page), ("full", None)]:
+                self.report(
+                    f"{label} ({suffix})",
+                    self.timed(lambda: list(legacy[:limit]), repeat),
+                    self.timed(lambda: list(engine[:limit]), repeat),
+                )
+
+        for label, params in [
+            ("tags all", {"tags": tags, "tags_match": "all"}),
+            ("tags exclude", {"tags": ",".join(f"-{pk}" for pk in tag_ids)}),
+        ]:
+            engine = self.engine(user, params)
+            elapsed = self.timed(lambda: list(engine[:page]), repeat)
+            self.stdout.write(f"{label:<32} engine {elapsed * 1000:9.2f} ms")
@@ -0,0 +1,47 @@
+"""
+Django command to benchmark the recipe list serialization paths.
+"""
+from django.db.models import Prefetch
+
+from core.models import Recipe, Tag, Ingredient
+from recipe.management.commands._benchmark import BenchmarkCommand
+from recipe.readers import RecipeListReader
+from recipe.serializers import RecipeSerializer
+
+
+class Command(BenchmarkCommand):
+    """Compare RecipeListReader with RecipeSerializer over model instances."""
+
+    help = __doc__
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+        parser.set_defaults(recipes=None)
+
+    def handle(self, *args, **options):
+        if options["recipes"] is None:
+            options["recipes"] = max(options["sizes"])
+        super().handle(*args, **options)
+
+    def run(self, user, options):
+        queryset = Recipe.objects.filter(user=user).order_by("-id")
+        prefetched = queryset.prefetch_related(
+            Prefetch("tags", queryset=Tag.objects.order_by("id")),
+            Prefetch("ingredients", queryset=Ingredient.objects.order_by("id")),
+        )
+        reader = RecipeListReader()
+        repeat = options["repeat"]
+
+        for size in options["sizes"]:
+            self.report(
+                f"{size} rows",
+                self.timed(
+                    lambda: RecipeSerializer(prefetched[:size], many=True).data,
+                    repeat,
+                ),
+                self.timed(
+                    lambda: reader.serialize(list(reader.values(queryset)[:size])),
+                    repeat,
+                ),
+            )
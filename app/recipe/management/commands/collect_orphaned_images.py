@@ -0,0 +1,255 @@
+"""
+Django command to delete recipe image files no recipe uses anymore.
+"""
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice, repeat
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from core.models import ImageBlob, ImageDerivativeJob, ImageUpload, Recipe
+from core.storage import PENDING_SUFFIX
+from recipe.media import IMAGE_DIRECTORY
+from recipe.uploads import partial_path
+
+
+def file_size(path):
+    """Return the size of file `path`, or 0 if it is gone."""
+    try:
+        return os.path.getsize(path)
+    except FileNotFoundError:
+        return 0
+
+
+def remove(path):
+    """Delete file `path` and return its size, or 0 if it is already gone."""
+    size = file_size(path)
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        return 0
+    return size
+
+
+def remove_older(path, cutoff):
+    """
+    Delete file `path` unless it was modified since `cutoff`, returning its size.
+
+    The modification time is read again, as an upload of the same content
+    touches the file to mark it as in use since it was scanned.
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return 0
+    if stat.st_mtime >= cutoff:
+        return 0
+    return remove(path)
+
+
+def media_name(path):
+    """Return the storage name of file `path` under `MEDIA_ROOT`."""
+    return os.path.relpath(path, settings.MEDIA_ROOT).replace(os.sep, "/")
+
+
+def walk(root):
+    """Yield `(path, mtime)` for the files under `root`, a directory at a time."""
+    stack = [root]
+    while stack:
+        try:
+            entries = os.scandir(stack.pop())
+        except FileNotFoundError:
+            continue
+        with entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    yield entry.path, entry.stat().st_mtime
+
+
+class Command(BaseCommand):
+    """
+    Django command to collect orphaned recipe images.
+
+    The names of the images in use are loaded as plain strings, then the
+    image directory is streamed against them: originals no recipe uses,
+    derivatives of those, interrupted uploads and partial files of chunked
+    uploads that no longer exist are deleted by a pool of `--workers`
+    threads, a window at a time. Files younger than `--min-age` seconds are
+    kept, as they may belong to a write that is not committed yet.
+
+    The scan works from a snapshot, so before a window is deleted, the blobs
+    of its images are locked and their reference counts read again, and the
+    modification time of each file is checked once more: images a recipe
+    started using since the scan are kept.
+
+    Chunked uploads started more than `CHUNKED_UPLOAD_TTL` seconds ago are
+    expired first, deleting both their row and their partial file.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument("--min-age", type=int, default=24 * 60 * 60)
+        parser.add_argument("--workers", type=int, default=8)
+        parser.add_argument("--window", type=int, default=1000)
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report orphaned files without deleting them.",
+        )
+
+    def referenced(self):
+        """Return the names of the images in use, with and without extension."""
+        names, stems = set(), set()
+        images = (
+            Recipe.objects.exclude(image="")
+            .exclude(image__isnull=True)
+            .values_list("image", flat=True)
+            .iterator()
+        )
+        for name in images:
+            names.add(name)
+            stems.add(os.path.splitext(name)[0])
+        return names, stems
+
+    def orphaned_images(self, cutoff):
+        """Yield the paths of image files older than `cutoff` no recipe uses."""
+        names, stems = self.referenced()
+        root = os.path.join(settings.MEDIA_ROOT, IMAGE_DIRECTORY)
+        for path, mtime in walk(root):
+            if mtime >= cutoff:
+                continue
+            name = media_name(path)
+            head, tail = os.path.split(name)
+            if tail.endswith(PENDING_SUFFIX):
+                yield path
+            elif os.path.basename(head) == "derivatives":
+                stem = os.path.splitext(tail)[0].rpartition("-")[0]
+                if f"{os.path.dirname(head)}/{stem}" not in stems:
+                    yield path
+            elif name not in names:
+                yield path
+
+    def expire_uploads(self, options):
+        """Delete expired chunked uploads, returning their count and size."""
+        ids = iter(list(ImageUpload.objects.expired().values_list("id", flat=True)))
+        found = freed = 0
+        while True:
+            window = list(islice(ids, options["window"]))
+            if not window:
+                return found, freed
+            if options["dry_run"]:
+                uploads = ImageUpload.objects.filter(id__in=window)
+                found += len(uploads)
+                freed += sum(file_size(partial_path(upload)) for upload in uploads)
+                continue
+            # Uploads locked by a chunk being written are left for next time.
+            with transaction.atomic():
+                uploads = list(
+                    ImageUpload.objects.expired()
+                    .select_for_update(skip_locked=True)
+                    .filter(id__in=window)
+                )
+                freed += sum(remove(partial_path(upload)) for upload in uploads)
+                ImageUpload.objects.filter(id__in=[u.id for u in uploads]).delete()
+            found += len(uploads)
+
+    def orphaned_uploads(self, cutoff):
+        """Yield the partial files older than `cutoff` of finished uploads."""
+        ids = ImageUpload.objects.values_list("id", flat=True).iterator()
+        uploads = {str(pk) for pk in ids}
+        for path, mtime in walk(settings.CHUNKED_UPLOAD_ROOT):
+            upload_id = os.path.basename(path).partition(".")[0]
+            if mtime < cutoff and upload_id not in uploads:
+                yield path
+
+    def unreferenced(self, paths):
+        """
+        Return the image files of `paths` no recipe uses, locking their blobs.
+
+        Derivatives are kept as long as their original is used. The locks
+        make recipes starting to use one of the images wait until the
+        caller's transaction ends.
+        """
+        names, stems = {}, {}
+        for path in paths:
+            name = media_name(path)
+            head, tail = os.path.split(name)
+            if tail.endswith(PENDING_SUFFIX):
+                continue
+            if os.path.basename(head) == "derivatives":
+                stem = os.path.splitext(tail)[0].rpartition("-")[0]
+                stems[path] = f"{os.path.dirname(head)}/{stem}."
+            else:
+                names[path] = name
+
+        query = Q(name__in=names.values())
+        for prefix in set(stems.values()):
+            query |= Q(name__startswith=prefix)
+        blobs = ImageBlob.objects.select_for_update().filter(query)
+        counts = blobs.values_list("name", "ref_count")
+        used = {name for name, count in counts if count > 0}
+        used_stems = {f"{os.path.splitext(name)[0]}." for name in used}
+        return [
+            path
+            for path in paths
+            if names.get(path) not in used and stems.get(path) not in used_stems
+        ]
+
+    def collect(self, paths, executor, options, cutoff, images=False):
+        """
+        Delete `paths` a window at a time, returning their count and size.
+
+        Image files are checked against the blobs once more first.
+        """
+        found = freed = 0
+        while True:
+            window = list(islice(paths, options["window"]))
+            if not window:
+                return found, freed
+            if options["dry_run"]:
+                found += len(window)
+                if options["verbosity"] > 1:
+                    for path in window:
+                        self.stdout.write(path)
+                freed += sum(map(file_size, window))
+                continue
+            with transaction.atomic():
+                if images:
+                    window = self.unreferenced(window)
+                freed += sum(executor.map(remove_older, window, repeat(cutoff)))
+                removed = [path for path in window if not os.path.exists(path)]
+                names = [media_name(path) for path in removed]
+                if images:
+                    ImageBlob.objects.filter(name__in=names, ref_count__lte=0).delete()
+                    ImageDerivativeJob.objects.filter(name__in=names).delete()
+            found += len(removed)
+            if options["verbosity"] > 1:
+                for path in removed:
+                    self.stdout.write(path)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        cutoff = time.time() - options["min_age"]
+        expired, expired_size = self.expire_uploads(options)
+        found = freed = 0
+        with ThreadPoolExecutor(max_workers=options["workers"]) as executor:
+            for paths, images in [
+                (self.orphaned_images(cutoff), True),
+                (self.orphaned_uploads(cutoff), False),
+            ]:
+                count, size = self.collect(paths, executor, options, cutoff, images)
+                found += count
+                freed += size
+
+        action = "would be deleted" if options["dry_run"] else "deleted"
+        self.stdout.write(
+            f"{expired} expired uploads {action}, {expired_size} bytes."
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f"{found} orphaned files {action}, {freed} bytes.")
+        )
@@ -0,0 +1,130 @@
+"""
+Serving of recipe images and their derivatives.
+"""
+import hashlib
+import mimetypes
+import os
+import posixpath
+import re
+
+from django.conf import settings
+from django.db.models import Q
+from django.http import HttpResponse, StreamingHttpResponse
+
+from recipe.images import DERIVATIVE_SIZES
+from recipe.uploads import CHUNK_READ_SIZE
+
+# Directory recipe images are stored in.
+IMAGE_DIRECTORY = "uploads/recipe"
+# Media names never change content, so they can be cached for a year.
+MEDIA_MAX_AGE = 365 * 24 * 60 * 60
+MEDIA_CACHE_CONTROL = f"private, max-age={MEDIA_MAX_AGE}, immutable"
+SENDFILE_HEADERS = {
+    "x-accel-redirect": "X-Accel-Redirect",
+    "x-sendfile": "X-Sendfile",
+}
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class RangeNotSatisfiable(Exception):
+    """Raised when a requested byte range lies outside of the file."""
+
+
+def image_filter(name):
+    """
+    Return a filter matching the recipes using media `name`, or None.
+
+    `name` is either a recipe image or one of its derivatives, which live
+    in a `derivatives` directory next to it and are named after its stem.
+    """
+    if posixpath.normpath(name) != name or not name.startswith(f"{IMAGE_DIRECTORY}/"):
+        return None
+    head, tail = posixpath.split(name)
+    if posixpath.basename(head) != "derivatives":
+        return Q(image=name)
+    stem, _, size = posixpath.splitext(tail)[0].rpartition("-")
+    if not stem or size not in DERIVATIVE_SIZES:
+        return None
+    return Q(image__startswith=f"{posixpath.dirname(head)}/{stem}.")
+
+
+def media_etag(name):
+    """Return a strong ETag for media `name`, whose content never changes."""
+    return f'"{hashlib.sha256(name.encode()).hexdigest()[:32]}"'
+
+
+def parse_range(header, size):
+    """
+    Return the `(start, end)` bytes, inclusive, of a single range `header`.
+
+    Returns None for headers that are not a single byte range, which are
+    answered with the whole file.
+    """
+    match = RANGE_RE.match(header or "")
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if not first:
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start, end = int(first), min(int(last), size - 1) if last else size - 1
+    if start > end or start >= size:
+        raise RangeNotSatisfiable(size)
+    return start, end
+
+
+def _read_range(path, start, length):
+    """Yield `length` bytes of file `path` from `start`, a chunk at a time."""
+    with open(path, "rb") as file:
+        file.seek(start)
+        while length > 0:
+            data = file.read(min(CHUNK_READ_SIZE, length))
+            if not data:
+                break
+            length -= len(data)
+            yield data
+
+
+def send_media(request, name, etag):
+    """
+    Return a response transferring media `name`.
+
+    With `MEDIA_SENDFILE` set, the transfer, including range requests, is
+    left to the front proxy through an internal redirect. Otherwise the file
+    is streamed from Django, honouring a single `Range` as long as
+    `If-Range`, when given, still matches.
+    """
+    content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+    header = SENDFILE_HEADERS.get(settings.MEDIA_SENDFILE)
+    if header == "X-Accel-Redirect":
+        response = HttpResponse(content_type=content_type)
+        response[header] = f"{settings.MEDIA_ACCEL_PREFIX}{name}"
+        return response
+    path = os.path.join(settings.MEDIA_ROOT, name)
+    if header is not None:
+        response = HttpResponse(content_type=content_type)
+        response[header] = path
+        return response
+
+    size = os.path.getsize(path)
+    byte_range = None
+    if request.headers.get("If-Range", etag) == etag:
+        try:
+            byte_range = parse_range(request.headers.get("Range"), size)
+        except RangeNotSatisfiable:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+            return response
+
+    start, end = byte_range or (0, size - 1)
+    response = StreamingHttpResponse(
+        _read_range(path, start, end - start + 1),
+        status=206 if byte_range else 200,
+        content_type=content_type,
+    )
+    response["Content-Length"] = end - start + 1
+    if byte_range:
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+    response["Accept-Ranges"] = "bytes"
+    return response
@@ -0,0 +1,91 @@
+"""
+View mixins for the recipe APIs.
+"""
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+from rest_framework.response import Response
+
+from core.models import CollectionVersion
+from recipe import cache
+
+
+class ConditionalGetMixin:
+    """
+    Answer conditional GETs from the user's collection version.
+
+    The version is bumped on every write to the user's recipes, tags and
+    ingredients, so a matching `If-None-Match` is answered with a 304 after
+    a single lookup, before the collection is queried. Views wrap their read
+    handlers with `conditional_response`.
+
+    Last-Modified is sent for information only: it has a resolution of one
+    second, so a write in the same second as a read would not change it,
+    and `If-Modified-Since` alone never gets a 304.
+    """
+
+    def get_validators(self):
+        """Return the ETag and Last-Modified timestamp for the request."""
+        version, modified = CollectionVersion.objects.for_user(self.request.user)
+        self.collection_version = version, modified
+        etag = f'W/"{version}-{self.request.accepted_renderer.format}"'
+        return etag, modified and int(modified.timestamp())
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        """Return a 304 if the client is up to date, otherwise call `handler`."""
+        etag, last_modified = self.get_validators()
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = self.get_current_response(handler, request, *args, **kwargs)
+        if response.status_code in [200, 304]:
+            response["ETag"] = etag
+            if last_modified:
+                response["Last-Modified"] = http_date(last_modified)
+            patch_vary_headers(response, ["Authorization"])
+        return response
+
+    def get_current_response(self, handler, request, *args, **kwargs):
+        """Return the full response for a client without a current copy."""
+        return handler(request, *args, **kwargs)
+
+
+class ResponseCacheMixin:
+    """
+    Cache read responses per user, collection version and query params.
+
+    Every write bumps the user's collection version, which is part of the
+    key, so stale entries are never served and age out of the bounded
+    cache. Users without a recorded version are not cached. Must be
+    combined with `ConditionalGetMixin`.
+    """
+
+    cache_list_params = []
+
+    def get_current_response(self, handler, request, *args, **kwargs):
+        """Return the cached response, or cache the one from `handler`."""
+        version, modified = self.collection_version
+        if modified is None:
+            return super().get_current_response(handler, request, *args, **kwargs)
+
+        response_cache = cache.get_cache()
+        key = cache.make_key(
+            request.user,
+            version,
+            modified,
+            request.path,
+            cache.normalize_params(request.query_params, self.cache_list_params),
+            request.accepted_renderer.format,
+        )
+        data = response_cache.get(key)
+        if data is not None:
+            cache.record(cache.HITS)
+            response = Response(data)
+            response["X-Cache"] = "HIT"
+            return response
+
+        cache.record(cache.MISSES)
+        response = super().get_current_response(handler, request, *args, **kwargs)
+        if response.status_code == 200:
+            response_cache.set(key, response.data)
+        response["X-Cache"] = "MISS"
+        return response
@@ -0,0 +1,88 @@
+"""
+Pagination classes for the recipe APIs.
+"""
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+
+from django.db.models import Q
+
+SEARCH_ORDERING = ("-search_rank", "-id")
+# Separates the rank from the ID in search cursor positions.
+POSITION_SEPARATOR = "|"
+
+
+class RecipeCursorPagination(CursorPagination):
+    """
+    Keyset pagination for recipes, newest first.
+
+    Search results are ordered by rank, then ID. Their cursors hold both,
+    so pages of recipes with the same rank are still found with a keyset
+    condition instead of an offset.
+    """
+
+    ordering = "-id"
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 200
+
+    def get_ordering(self, request, queryset, view):
+        """Rank search results first, falling back to newest first."""
+        if "search_rank" in queryset.query.annotations:
+            return SEARCH_ORDERING
+        return super().get_ordering(request, queryset, view)
+
+    def _get_position_from_instance(self, instance, ordering):
+        """Return `rank|id` for search results, the ordering field otherwise."""
+        if tuple(ordering) != SEARCH_ORDERING:
+            return super()._get_position_from_instance(instance, ordering)
+        if isinstance(instance, dict):
+            rank, pk = instance["search_rank"], instance["id"]
+        else:
+            rank, pk = instance.search_rank, instance.id
+        return f"{rank!r}{POSITION_SEPARATOR}{pk}"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Page search results on `(search_rank, id)`, others as usual."""
+        if "search_rank" not in queryset.query.annotations:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        self.base_url = request.build_absolute_uri()
+        self.ordering = SEARCH_ORDERING
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor is not None and self.cursor.reverse
+        position = self.cursor and self.cursor.position
+
+        if reverse:
+            queryset = queryset.order_by("search_rank", "id")
+            lookup = "gt"
+        else:
+            queryset = queryset.order_by(*SEARCH_ORDERING)
+            lookup = "lt"
+        if position is not None:
+            try:
+                rank, pk = position.split(POSITION_SEPARATOR)
+                rank, pk = float(rank), int(pk)
+            except ValueError:
+                raise NotFound(self.invalid_cursor_message)
+            queryset = queryset.filter(
+                Q(**{f"search_rank__{lookup}": rank})
+                | Q(search_rank=rank, **{f"id__{lookup}": pk})
+            )
+
+        results = list(queryset[: self.page_size + 1])
+        self.page = results[: self.page_size]
+        following = None
+        if len(results) > len(self.page):
+            following = self._get_position_from_instance(results[-1], self.ordering)
+
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = position is not None, bool(following)
+            self.next_position, self.previous_position = position, following
+        else:
+            self.has_next, self.has_previous = bool(following), position is not None
+            self.next_position, self.previous_position = following, position
+        return self.page
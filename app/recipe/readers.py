@@ -0,0 +1,81 @@
+"""
+Fast read paths for the recipe APIs.
+"""
+from core.models import Recipe
+from recipe.serializers import RecipeSerializer
+
+RELATION_FIELDS = {"tags": ["id", "name"], "ingredients": ["id", "name"]}
+
+
+class RecipeListReader:
+    """
+    Build `RecipeSerializer` output, or that of a subclass, from value rows.
+
+    Recipes are read with `values()` and their relations with one grouped
+    query per relation against the through table, so no model instances
+    are created. Scalar fields reuse the serializer's own fields for
+    `to_representation`, which keeps the output identical.
+    """
+
+    def __init__(
+        self, fields=None, expand=None, serializer_class=RecipeSerializer, context=None
+    ):
+        self.expand = set(RELATION_FIELDS) if fields is None else set(expand or [])
+        self.fields = serializer_class(
+            fields=fields, expand=expand, context=context
+        ).fields
+        self.scalars = [
+            (name, field)
+            for name, field in self.fields.items()
+            if name not in RELATION_FIELDS
+        ]
+        self.relations = [name for name in self.fields if name in RELATION_FIELDS]
+
+    def values(self, queryset):
+        """Return `queryset` as value rows holding the needed columns."""
+        columns = {"id", *(field.source for _, field in self.scalars)}
+        columns.update(queryset.query.annotations)
+        return queryset.prefetch_related(None).values(*columns)
+
+    def _related(self, name, recipe_ids):
+        """Return a mapping of recipe ID to the representation of `name`."""
+        field = Recipe._meta.get_field(name)
+        through = field.remote_field.through
+        source = f"{field.m2m_field_name()}_id"
+        target = field.m2m_reverse_field_name()
+        columns = [source, f"{target}_id"]
+        if name in self.expand:
+            columns.append(f"{target}__name")
+        rows = (
+            through.objects.filter(**{f"{source}__in": recipe_ids})
+            .order_by(f"{target}_id")
+            .values_list(*columns)
+        )
+
+        grouped = {pk: [] for pk in recipe_ids}
+        if name in self.expand:
+            keys = RELATION_FIELDS[name]
+            for recipe_id, *values in rows:
+                grouped[recipe_id].append(dict(zip(keys, values)))
+        else:
+            for recipe_id, related_id in rows:
+                grouped[recipe_id].append(related_id)
+        return grouped
+
+    def serialize(self, rows):
+        """Return the serialized representation of value `rows`."""
+        recipe_ids = [row["id"] for row in rows]
+        related = {name: self._related(name, recipe_ids) for name in self.relations}
+
+        data = []
+        for row in rows:
+            item = {}
+            for name, field in self.fields.items():
+                if name in related:
+                    item[name] = related[name][row["id"]]
+                elif row[field.source] is None:
+                    item[name] = None
+                else:
+                    item[name] = field.to_representation(row[field.source])
+            data.append(item)
+        return data
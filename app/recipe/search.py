@@ -0,0 +1,77 @@
+"""
+Search helpers for the recipe APIs.
+"""
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    TrigramWordSimilarity,
+)
+from django.db import connection
+from django.db.models import (
+    BooleanField,
+    Case,
+    ExpressionWrapper,
+    F,
+    FloatField,
+    Q,
+    Value,
+    When,
+)
+from django.db.models.functions import Cast
+
+SEARCH_CONFIG = "english"
+
+# Default PostgreSQL weights for the 'A' (title) and 'B' (description) labels.
+TITLE_WEIGHT = 1.0
+DESCRIPTION_WEIGHT = 0.4
+
+
+def search_recipes(queryset, term):
+    """
+    Filter `queryset` to recipes matching `term` and annotate `search_rank`.
+
+    On PostgreSQL this queries the trigger maintained `search_vector`
+    column through its GIN index. Other backends fall back to matching
+    every word against the title or description, weighted the same way.
+    """
+    if connection.vendor == "postgresql":
+        query = SearchQuery(term, config=SEARCH_CONFIG, search_type="websearch")
+        return queryset.filter(search_vector=query).annotate(
+            search_rank=Cast(SearchRank(F("search_vector"), query), FloatField())
+        )
+
+    rank = Value(0.0)
+    for word in term.split():
+        queryset = queryset.filter(
+            Q(title__icontains=word) | Q(description__icontains=word)
+        )
+        rank += Case(
+            When(title__icontains=word, then=Value(TITLE_WEIGHT)),
+            default=Value(0.0),
+        ) + Case(
+            When(description__icontains=word, then=Value(DESCRIPTION_WEIGHT)),
+            default=Value(0.0),
+        )
+    return queryset.annotate(search_rank=Cast(rank, FloatField()))
+
+
+def autocomplete_names(queryset, term, limit):
+    """
+    Return up to `limit` objects from `queryset` whose name matches `term`.
+
+    Prefix matches come first. On PostgreSQL the remaining slots are
+    filled with fuzzy pg_trgm word matches ordered by similarity, otherwise
+    with names containing `term`.
+    """
+    is_prefix = ExpressionWrapper(Q(name__istartswith=term), BooleanField())
+    if connection.vendor == "postgresql":
+        queryset = queryset.filter(
+            Q(name__istartswith=term) | Q(name__trigram_word_similar=term)
+        ).annotate(
+            is_prefix=is_prefix, similarity=TrigramWordSimilarity(term, "name")
+        )
+        ordering = ["-is_prefix", "-similarity", "name"]
+    else:
+        queryset = queryset.filter(name__icontains=term).annotate(is_prefix=is_prefix)
+        ordering = ["-is_prefix", "name"]
+    return queryset.order_by(*ordering)[:limit]
@@ -1,56 +1,222 @@
 """
 Serializers for recipe APIs
 """
-from rest_framework.serializers import ModelSerializer
+from rest_framework.serializers import (
+    Serializer,
+    ReadOnlyField,
+    ModelSerializer,
+    CharField,
+    IntegerField,
+    ListField,
+    PrimaryKeyRelatedField,
+    ValidationError,
+)
 
-from core.models import Recipe, Tag, Ingredient
+from django.conf import settings
+from django.core.files.storage import default_storage
 
+from core.models import (
+    Recipe,
+    Tag,
+    Ingredient,
+    CollectionVersion,
+    ImportJob,
+    ImageUpload,
+)
+from recipe.images import derivative_names
 
-class IngredientSerializer(ModelSerializer):
+
+def related_ids(name, names, user):
+    """
+    Return a mapping of name to ID of the user's `name` objects in `names`.
+
+    Names match case-insensitively and missing objects are created, in a
+    single upsert on PostgreSQL however many names there are.
+    """
+    model = Recipe._meta.get_field(name).related_model
+    return model.objects.get_or_create_names(user, names)
+
+
+def through_columns(name):
+    """Return the through model of recipe relation `name` and its ID columns."""
+    field = Recipe._meta.get_field(name)
+    return (
+        field.remote_field.through,
+        f"{field.m2m_field_name()}_id",
+        f"{field.m2m_reverse_field_name()}_id",
+    )
+
+
+class ImageDerivativesField(ReadOnlyField):
+    """
+    Field holding the URLs of the derivatives of a recipe image.
+
+    Its source names the image whose derivatives have been generated, so
+    URLs are only given once the files exist.
+    """
+
+    def to_representation(self, value):
+        """Return `{size: {format: url}}`, or None without derivatives."""
+        name = getattr(value, "name", value)
+        if not name:
+            return None
+        request = self.context.get("request")
+        urls = {}
+        for size, fmt, path in derivative_names(name):
+            url = default_storage.url(path)
+            if request is not None:
+                url = request.build_absolute_uri(url)
+            urls.setdefault(size, {})[fmt] = url
+        return urls
+
+
+class RecipeAttrSerializer(ModelSerializer):
+    """Base serializer for user owned recipe attributes."""
+
+    recipe_count = IntegerField(read_only=True)
+
+    def __init__(self, *args, recipe_count=False, **kwargs):
+        """Include `recipe_count` only when asked to."""
+        super().__init__(*args, **kwargs)
+        if not recipe_count:
+            self.fields.pop("recipe_count")
+
+
+class IngredientSerializer(RecipeAttrSerializer):
     """Serializer for ingredients."""
 
     class Meta:
         model = Ingredient
-        fields = ["id", "name"]
+        fields = ["id", "name", "recipe_count"]
         read_only_fields = ["id"]
 
 
-class TagSerializer(ModelSerializer):
+class TagSerializer(RecipeAttrSerializer):
     """Serializer for tags."""
 
     class Meta:
         model = Tag
-        fields = ["id", "name"]
+        fields = ["id", "name", "recipe_count"]
         read_only_fields = ["id"]
 
 
+class BulkDeleteSerializer(Serializer):
+    """Serializer for deleting many tags or ingredients."""
+
+    ids = ListField(child=IntegerField(min_value=1), allow_empty=False)
+
+
+class BulkRenameItemSerializer(Serializer):
+    """Serializer for one rename of a bulk rename."""
+
+    id = IntegerField(min_value=1)
+    name = CharField(max_length=255)
+
+
+class BulkRenameSerializer(Serializer):
+    """Serializer for renaming many tags or ingredients."""
+
+    items = BulkRenameItemSerializer(many=True, allow_empty=False)
+
+    def validate_items(self, items):
+        """Reject renaming the same object twice."""
+        ids = [item["id"] for item in items]
+        if len(ids) != len(set(ids)):
+            raise ValidationError("Each ID may only be renamed once.")
+        return items
+
+
 class RecipeSerializer(ModelSerializer):
     """Serializer for recipes."""
 
     tags = TagSerializer(many=True, required=False)
     ingredients = IngredientSerializer(many=True, required=False)
+    image_derivatives = ImageDerivativesField()
 
     class Meta:
         model = Recipe
-        fields = ["id", "title", "time_minutes", "price", "link", "tags", "ingredients"]
+        fields = [
+            "id",
+            "title",
+            "time_minutes",
+            "price",
+            "link",
+            "tags",
+            "ingredients",
+            "image_derivatives",
+            "image_width",
+            "image_height",
+            "image_size",
+            "image_placeholder",
+        ]
         read_only_fields = ["id"]
 
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        """
+        Optionally limit the serializer to `fields`.
+
+        When `fields` is given, relations not listed in `expand` are
+        represented by their IDs instead of nested objects.
+        """
+        super().__init__(*args, **kwargs)
+        if fields is None:
+            return
+        for name in set(self.fields) - set(fields):
+            self.fields.pop(name)
+        for name in {"tags", "ingredients"} & set(self.fields) - set(expand or []):
+            self.fields[name] = PrimaryKeyRelatedField(many=True, read_only=True)
+
+    def _resolve_related(self, name, items, user):
+        """Return the IDs of the user's `name` objects in `items`, in order."""
+        names = list(dict.fromkeys(item["name"] for item in items))
+        ids = related_ids(name, names, user)
+        return list(dict.fromkeys(ids[n] for n in names))
+
+    def _link_related(self, name, recipe, add_ids=(), remove_ids=()):
+        """Insert and delete `recipe`'s through rows for `name` in bulk."""
+        through, source, target = through_columns(name)
+        if remove_ids:
+            through.objects.filter(
+                **{source: recipe.id, f"{target}__in": remove_ids}
+            ).delete()
+        if add_ids:
+            through.objects.bulk_create(
+                [through(**{source: recipe.id, target: pk}) for pk in add_ids],
+                ignore_conflicts=True,
+            )
+        getattr(recipe, "_prefetched_objects_cache", {}).pop(name, None)
+
+    def _get_or_create_related(self, name, items, recipe):
+        """Link a new `recipe` to the `name` objects in `items`."""
+        ids = self._resolve_related(name, items, recipe.user)
+        self._link_related(name, recipe, add_ids=ids)
+
+    def _set_related(self, name, items, recipe):
+        """
+        Make `items` the `name` objects of `recipe`.
+
+        Only the difference with the current through rows is inserted or
+        deleted, so unchanged links are left untouched.
+        """
+        through, source, target = through_columns(name)
+        wanted = set(self._resolve_related(name, items, recipe.user))
+        current = set(
+            through.objects.filter(**{source: recipe.id}).values_list(target, flat=True)
+        )
+        self._link_related(
+            name,
+            recipe,
+            add_ids=sorted(wanted - current),
+            remove_ids=sorted(current - wanted),
+        )
+
     def _get_or_create_tags(self, tags, recipe):
         """Handle getting or creating tags as needed."""
-        auth_user = self.context["request"].user
-        for tag in tags:
-            tag_obj, _ = Tag.objects.get_or_create(user=auth_user, **tag)
-            recipe.tags.add(tag_obj)
+        self._get_or_create_related("tags", tags, recipe)
 
     def _get_or_create_ingredients(self, ingredients, recipe):
         """Handle getting or creating ingredients as needed."""
-        auth_user = self.context["request"].user
-        for ingredient in ingredients:
-            ingredient_obj, created = Ingredient.objects.get_or_create(
-                user=auth_user,
-                **ingredient,
-            )
-            recipe.ingredients.add(ingredient_obj)
+        self._get_or_create_related("ingredients", ingredients, recipe)
 
     def create(self, validated_data):
         """Create a recipe."""
@@ -59,6 +225,7 @@ class RecipeSerializer(ModelSerializer):
         recipe = Recipe.objects.create(**validated_data)
         self._get_or_create_tags(tags, recipe)
         self._get_or_create_ingredients(ingredients, recipe)
+        CollectionVersion.objects.bump(recipe.user)
 
         return recipe
 
@@ -67,16 +234,15 @@ class RecipeSerializer(ModelSerializer):
         tags = validated_data.pop("tags", None)
         ingredients = validated_data.pop("ingredients", None)
         if tags is not None:
-            instance.tags.clear()
-            self._get_or_create_tags(tags, instance)
+            self._set_related("tags", tags, instance)
         if ingredients is not None:
-            instance.ingredients.clear()
-            self._get_or_create_ingredients(ingredients, instance)
+            self._set_related("ingredients", ingredients, instance)
 
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
 
         instance.save()
+        CollectionVersion.objects.bump(instance.user)
         return instance
 
 
@@ -87,11 +253,91 @@ class RecipeDetailSerializer(RecipeSerializer):
         fields = RecipeSerializer.Meta.fields + ["description", "image"]
 
 
+class RecipeBatchItemSerializer(RecipeSerializer):
+    """Serializer for one recipe of a batch write, updated when it has an ID."""
+
+    id = IntegerField(required=False, min_value=1)
+
+    class Meta(RecipeSerializer.Meta):
+        fields = RecipeSerializer.Meta.fields + ["description"]
+        read_only_fields = []
+
+
 class RecipeImageSerializer(ModelSerializer):
     """Serializer for uploading images to recipes."""
 
+    image_derivatives = ImageDerivativesField()
+
     class Meta:
         model = Recipe
-        fields = ["id", "image"]
+        fields = ["id", "image", "image_derivatives"]
         read_only_fields = ["id"]
         extra_kwargs = {"image": {"required": True}}
+
+
+class ImageUploadSerializer(ModelSerializer):
+    """Serializer for chunked recipe image uploads."""
+
+    class Meta:
+        model = ImageUpload
+        fields = ["id", "filename", "size", "offset"]
+        read_only_fields = ["id", "offset"]
+
+    def validate_size(self, size):
+        """Reject images larger than `MAX_IMAGE_UPLOAD_SIZE`."""
+        if not 0 < size <= settings.MAX_IMAGE_UPLOAD_SIZE:
+            raise ValidationError(
+                f"Must be between 1 and {settings.MAX_IMAGE_UPLOAD_SIZE} bytes."
+            )
+        return size
+
+
+class ImportJobSerializer(ModelSerializer):
+    """Serializer for recipe import jobs."""
+
+    class Meta:
+        model = ImportJob
+        fields = [
+            "id",
+            "file",
+            "format",
+            "status",
+            "processed_rows",
+            "created_rows",
+            "failed_rows",
+            "created",
+            "finished",
+        ]
+        read_only_fields = [
+            "id",
+            "status",
+            "processed_rows",
+            "created_rows",
+            "failed_rows",
+            "created",
+            "finished",
+        ]
+        extra_kwargs = {
+            "file": {"write_only": True},
+            "format": {"required": False},
+        }
+
+    def validate(self, attrs):
+        """Infer the format from the file extension when it is not given."""
+        if "format" not in attrs:
+            ext = attrs["file"].name.rsplit(".", 1)[-1].lower()
+            if ext not in dict(ImportJob.FORMAT_CHOICES):
+                raise ValidationError({"format": "Could not infer the file format."})
+            attrs["format"] = ext
+        return attrs
+
+
+class ImportJobDetailSerializer(ImportJobSerializer):
+    """Serializer for import job detail view."""
+
+    class Meta(ImportJobSerializer.Meta):
+        fields = ImportJobSerializer.Meta.fields + ["message", "errors"]
+        read_only_fields = ImportJobSerializer.Meta.read_only_fields + [
+            "message",
+            "errors",
+        ]
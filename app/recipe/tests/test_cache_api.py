@@ -0,0 +1,178 @@
+"""
+Tests for the recipe API response cache.
+"""
+from django.contrib.auth import get_user_model
+from django.http import QueryDict
+from django.test import TestCase, SimpleTestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.status import HTTP_200_OK
+from rest_framework.test import APIClient
+
+from core.models import CollectionVersion, Recipe, Tag
+from core.constants.mock_data import john_doe, mock_recipe, mock_user
+from recipe import cache
+
+RECIPES_URL = reverse("recipe:recipe-list")
+TAGS_URL = reverse("recipe:tag-list")
+
+
+def create_user(**params):
+    """Create and return a new user."""
+    return get_user_model().objects.create_user(**params)
+
+
+class NormalizeParamsTests(SimpleTestCase):
+    """Test query param normalization."""
+
+    def test_order_ignored(self):
+        """Test parameter order and list item order are ignored."""
+        first = QueryDict("tags=2,1,2&search=curry")
+        second = QueryDict("search=curry&tags=1,2")
+
+        self.assertEqual(
+            cache.normalize_params(first, ["tags"]),
+            cache.normalize_params(second, ["tags"]),
+        )
+
+    def test_blanks_kept(self):
+        """Test a blank value is not the same as a missing parameter."""
+        blank = QueryDict("fields=&search=curry")
+
+        self.assertEqual(
+            cache.normalize_params(blank, ["fields"]), "fields=&search=curry"
+        )
+        self.assertNotEqual(
+            cache.normalize_params(blank, ["fields"]),
+            cache.normalize_params(QueryDict("search=curry"), ["fields"]),
+        )
+
+    def test_non_list_params_kept(self):
+        """Test values of other params are kept as given."""
+        params = QueryDict("search=b,a")
+
+        self.assertEqual(cache.normalize_params(params, ["tags"]), "search=b,a")
+
+
+class ResponseCacheTests(TestCase):
+    """Test caching of read responses."""
+
+    def setUp(self):
+        cache.get_cache().clear()
+        self.client = APIClient()
+        self.user = create_user(**john_doe)
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(user=self.user, **mock_recipe())
+        CollectionVersion.objects.bump(self.user)
+
+    def test_repeated_list_hits_cache(self):
+        """Test a repeated list is served from the cache."""
+        first = self.client.get(RECIPES_URL)
+
+        with self.assertNumQueries(1):
+            second = self.client.get(RECIPES_URL)
+
+        self.assertEqual(first["X-Cache"], "MISS")
+        self.assertEqual(second["X-Cache"], "HIT")
+        self.assertEqual(second.status_code, HTTP_200_OK)
+        self.assertEqual(second.data, first.data)
+
+    def test_equivalent_params_share_entry(self):
+        """Test normalized query params share a cache entry."""
+        tag = Tag.objects.create(user=self.user, name="Vegan")
+        other = Tag.objects.create(user=self.user, name="Quick")
+        self.client.get(RECIPES_URL, {"tags": f"{tag.id},{other.id}"})
+
+        res = self.client.get(RECIPES_URL, {"tags": f"{other.id},{tag.id}"})
+
+        self.assertEqual(res["X-Cache"], "HIT")
+
+    def test_blank_fields_not_served_for_plain_list(self):
+        """Test a list with a blank field selection is cached on its own."""
+        self.client.get(RECIPES_URL, {"fields": ""})
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.data["results"][0]["id"], self.recipe.id)
+        self.assertIn("title", res.data["results"][0])
+
+    def test_different_params_miss(self):
+        """Test different query params are cached separately."""
+        self.client.get(RECIPES_URL)
+
+        res = self.client.get(RECIPES_URL, {"fields": "id"})
+
+        self.assertEqual(res["X-Cache"], "MISS")
+        self.assertEqual(list(res.data["results"][0]), ["id"])
+
+    def test_write_invalidates(self):
+        """Test writes through the API invalidate cached responses."""
+        url = reverse("recipe:recipe-detail", args=[self.recipe.id])
+        self.client.get(RECIPES_URL)
+        self.client.get(url)
+
+        self.client.patch(url, {"title": "Renamed"})
+
+        for res in [self.client.get(RECIPES_URL), self.client.get(url)]:
+            self.assertEqual(res["X-Cache"], "MISS")
+        self.assertEqual(res.data["title"], "Renamed")
+
+    def test_tag_write_invalidates_recipes(self):
+        """Test renaming a tag invalidates cached recipes and tags."""
+        tag = Tag.objects.create(user=self.user, name="Vegan")
+        self.recipe.tags.add(tag)
+        self.client.get(RECIPES_URL)
+        self.client.get(TAGS_URL)
+
+        self.client.patch(reverse("recipe:tag-detail", args=[tag.id]), {"name": "V"})
+
+        res = self.client.get(RECIPES_URL)
+        self.assertEqual(res["X-Cache"], "MISS")
+        self.assertEqual(res.data["results"][0]["tags"][0]["name"], "V")
+        self.assertEqual(self.client.get(TAGS_URL)["X-Cache"], "MISS")
+
+    def test_users_isolated(self):
+        """Test users never share cached responses."""
+        self.client.get(RECIPES_URL)
+        other_user = create_user(**mock_user())
+        CollectionVersion.objects.bump(other_user)
+        other = APIClient()
+        other.force_authenticate(other_user)
+
+        res = other.get(RECIPES_URL)
+
+        self.assertEqual(res["X-Cache"], "MISS")
+        self.assertEqual(res.data["results"], [])
+
+    def test_stats(self):
+        """Test hits and misses are counted."""
+        self.client.get(RECIPES_URL)
+        self.client.get(RECIPES_URL)
+        self.client.get(RECIPES_URL)
+
+        self.assertEqual(cache.stats(), {"hits": 2, "misses": 1})
+
+    @override_settings(
+        CACHES={
+            "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+            "api": {
+                "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+                "LOCATION": "recipe-api-bounded",
+                "OPTIONS": {"MAX_ENTRIES": 4, "CULL_FREQUENCY": 4},
+            },
+        }
+    )
+    def test_bounded_lru(self):
+        """Test the least recently used response is evicted when full."""
+        self.client.get(RECIPES_URL, {"fields": "id"})
+        self.client.get(RECIPES_URL, {"fields": "title"})
+        self.client.get(RECIPES_URL, {"fields": "id"})
+
+        self.client.get(RECIPES_URL, {"fields": "price"})
+
+        self.assertEqual(
+            self.client.get(RECIPES_URL, {"fields": "id"})["X-Cache"], "HIT"
+        )
+        self.assertEqual(
+            self.client.get(RECIPES_URL, {"fields": "title"})["X-Cache"], "MISS"
+        )
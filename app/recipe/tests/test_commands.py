@@ -0,0 +1,242 @@
+"""
+Tests for recipe management commands.
+"""
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core.constants.mock_data import john_doe, mock_recipe
+from core.models import (
+    CollectionVersion,
+    ImageBlob,
+    ImageDerivativeJob,
+    ImageUpload,
+    Recipe,
+)
+from recipe.images import derivative_names
+from recipe.management.commands.collect_orphaned_images import (
+    Command as CollectOrphanedImages,
+)
+from recipe.tests.test_images import save_image, delete_image
+
+
+class BenchmarkCommandTests(TestCase):
+    """Test benchmark commands run and leave no data behind."""
+
+    def test_benchmark_recipe_filters(self):
+        """Test the filter benchmark reports every scenario."""
+        out = StringIO()
+
+        call_command("benchmark_recipe_filters", recipes=20, repeat=1, stdout=out)
+
+        self.assertIn("tags any (page)", out.getvalue())
+        self.assertIn("tags exclude", out.getvalue())
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_benchmark_recipe_list(self):
+        """Test the list benchmark reports every size."""
+        out = StringIO()
+
+        call_command("benchmark_recipe_list", sizes=[5, 10], repeat=1, stdout=out)
+
+        self.assertIn("5 rows", out.getvalue())
+        self.assertIn("10 rows", out.getvalue())
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_benchmark_json_renderer(self):
+        """Test the JSON benchmark reports rendering and parsing."""
+        out = StringIO()
+
+        call_command("benchmark_json_renderer", recipes=10, repeat=1, stdout=out)
+
+        self.assertIn("render 10 recipes", out.getvalue())
+        self.assertIn("parse", out.getvalue())
+
+
+class BackfillImageDerivativesCommandTests(TestCase):
+    """Test backfilling derivatives and metadata of existing images."""
+
+    def setUp(self):
+        user = get_user_model().objects.create_user(**john_doe)
+        self.name = save_image()
+        self.addCleanup(delete_image, self.name)
+        Recipe.objects.create(user=user, image=self.name, **mock_recipe())
+        Recipe.objects.create(user=user, **mock_recipe())
+
+    def assertDerivativesExist(self):
+        """Assert every derivative of the test image exists."""
+        for _, _, path in derivative_names(self.name):
+            self.assertTrue(default_storage.exists(path), path)
+
+    def test_backfill_queues_jobs(self):
+        """Test a job is queued per image and run by the derivative worker."""
+        out = StringIO()
+
+        call_command("backfill_image_derivatives", stdout=out)
+
+        self.assertIn("1 images queued,", out.getvalue())
+        job = ImageDerivativeJob.objects.get(name=self.name)
+        self.assertEqual(job.status, ImageDerivativeJob.PENDING)
+        call_command("process_image_derivatives", once=True, stdout=StringIO())
+        self.assertDerivativesExist()
+        recipe = Recipe.objects.get(image=self.name)
+        self.assertEqual(recipe.image_derivatives, self.name)
+
+    def test_backfill_skips_done_images(self):
+        """Test images with generated derivatives are only queued to overwrite."""
+        call_command("backfill_image_derivatives", stdout=StringIO())
+        call_command("process_image_derivatives", once=True, stdout=StringIO())
+        out = StringIO()
+
+        call_command("backfill_image_derivatives", stdout=out)
+        self.assertIn("0 images queued,", out.getvalue())
+        call_command("backfill_image_derivatives", overwrite=True, stdout=out)
+        self.assertIn("1 images queued,", out.getvalue())
+
+    def test_backfill_metadata(self):
+        """Test the metadata of images uploaded without it is filled in."""
+        out = StringIO()
+
+        call_command("backfill_image_derivatives", stdout=out)
+
+        recipe = Recipe.objects.get(image=self.name)
+        self.assertEqual((recipe.image_width, recipe.image_height), (600, 300))
+        self.assertEqual(recipe.image_size, default_storage.size(self.name))
+        self.assertTrue(recipe.image_placeholder)
+        self.assertEqual(CollectionVersion.objects.for_user(recipe.user)[0], 1)
+        self.assertIn("metadata of 1 images filled in, 0 failed.", out.getvalue())
+
+        call_command("backfill_image_derivatives", stdout=out)
+        self.assertIn("metadata of 0 images filled in", out.getvalue())
+
+
+class CollectOrphanedImagesCommandTests(TestCase):
+    """Test deleting image files no recipe uses."""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.upload_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        self.addCleanup(shutil.rmtree, self.upload_root)
+        settings = override_settings(
+            MEDIA_ROOT=self.media_root, CHUNKED_UPLOAD_ROOT=self.upload_root
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.user = user = get_user_model().objects.create_user(**john_doe)
+        recipe = Recipe.objects.create(
+            user=user, image="uploads/recipe/ab/ab.jpg", **mock_recipe()
+        )
+        self.upload = ImageUpload.objects.create(
+            user=user, recipe=recipe, filename="photo.jpg", size=10
+        )
+        self.expired = ImageUpload.objects.create(
+            user=user,
+            recipe=recipe,
+            filename="photo.jpg",
+            size=10,
+            created=timezone.now() - timedelta(days=2),
+        )
+        orphan = Recipe.objects.create(
+            user=user, image="uploads/recipe/cd/cd.jpg", **mock_recipe()
+        )
+        orphan.delete()
+        ImageDerivativeJob.objects.create(
+            name=orphan.image.name, status=ImageDerivativeJob.DONE
+        )
+
+        self.kept = [
+            self.create_file("uploads/recipe/ab/ab.jpg"),
+            self.create_file("uploads/recipe/ab/derivatives/ab-thumb.webp"),
+            self.create_file("uploads/recipe/ef/ef.jpg", age=0),
+            self.create_file(f"{self.upload.id}.part", root=self.upload_root),
+        ]
+        self.orphaned = [
+            self.create_file("uploads/recipe/cd/cd.jpg"),
+            self.create_file("uploads/recipe/cd/derivatives/cd-thumb.webp"),
+            self.create_file("uploads/recipe/tmp1234.pending"),
+            self.create_file("0000-gone.part", root=self.upload_root),
+        ]
+        self.expired_file = self.create_file(
+            f"{self.expired.id}.part", root=self.upload_root, age=0
+        )
+
+    def create_file(self, name, root=None, age=2 * 24 * 60 * 60):
+        """Create a file of 10 bytes modified `age` seconds ago."""
+        path = os.path.join(root or self.media_root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as file:
+            file.write(b"0123456789")
+        mtime = time.time() - age
+        os.utime(path, (mtime, mtime))
+        return path
+
+    def test_collect_orphaned_images(self):
+        """Test old files nothing references are deleted."""
+        out = StringIO()
+
+        call_command("collect_orphaned_images", workers=2, window=1, stdout=out)
+
+        for path in self.kept:
+            self.assertTrue(os.path.exists(path), path)
+        for path in self.orphaned:
+            self.assertFalse(os.path.exists(path), path)
+        self.assertIn("4 orphaned files deleted, 40 bytes.", out.getvalue())
+        names = ImageBlob.objects.values_list("name", flat=True)
+        self.assertEqual(list(names), ["uploads/recipe/ab/ab.jpg"])
+        self.assertFalse(ImageDerivativeJob.objects.exists())
+
+    def test_images_used_after_scan(self):
+        """Test files used or touched since the scan started are kept."""
+        command = CollectOrphanedImages()
+        cutoff = time.time() - 24 * 60 * 60
+        paths = iter(list(command.orphaned_images(cutoff)))
+        Recipe.objects.create(
+            user=self.user, image="uploads/recipe/cd/cd.jpg", **mock_recipe()
+        )
+        os.utime(self.orphaned[2])
+        options = {"window": 1000, "dry_run": False, "verbosity": 1}
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            found, freed = command.collect(paths, executor, options, cutoff, True)
+
+        self.assertEqual((found, freed), (0, 0))
+        for path in self.orphaned[:3]:
+            self.assertTrue(os.path.exists(path), path)
+        blobs = ImageBlob.objects.filter(name="uploads/recipe/cd/cd.jpg")
+        self.assertTrue(blobs.exists())
+
+    def test_expire_uploads(self):
+        """Test uploads older than the TTL are deleted with their partial file."""
+        out = StringIO()
+
+        call_command("collect_orphaned_images", stdout=out)
+
+        self.assertFalse(os.path.exists(self.expired_file))
+        self.assertFalse(ImageUpload.objects.filter(id=self.expired.id).exists())
+        self.assertTrue(ImageUpload.objects.filter(id=self.upload.id).exists())
+        self.assertIn("1 expired uploads deleted, 10 bytes.", out.getvalue())
+
+    def test_collect_orphaned_images_dry_run(self):
+        """Test a dry run only reports orphaned files."""
+        out = StringIO()
+
+        call_command("collect_orphaned_images", dry_run=True, verbosity=2, stdout=out)
+
+        for path in self.kept + self.orphaned:
+            self.assertTrue(os.path.exists(path), path)
+            self.assertEqual(path in out.getvalue(), path in self.orphaned)
+        self.assertIn("4 orphaned files would be deleted, 40 bytes.", out.getvalue())
+        self.assertTrue(os.path.exists(self.expired_file))
+        self.assertIn("1 expired uploads would be deleted, 10 bytes.", out.getvalue())
@@ -0,0 +1,150 @@
+"""
+Tests for conditional GET support on the recipe APIs.
+"""
+import tempfile
+from unittest.mock import patch
+
+from PIL import Image
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework.status import HTTP_200_OK, HTTP_304_NOT_MODIFIED
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+from core.constants.mock_data import john_doe, mock_recipe, mock_user
+
+RECIPES_URL = reverse("recipe:recipe-list")
+TAGS_URL = reverse("recipe:tag-list")
+INGREDIENTS_URL = reverse("recipe:ingredient-list")
+
+
+def create_user(**params):
+    """Create and return a new user."""
+    return get_user_model().objects.create_user(**params)
+
+
+class ConditionalGetTests(TestCase):
+    """Test ETag and Last-Modified handling."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(**john_doe)
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(user=self.user, **mock_recipe())
+        self.tag = Tag.objects.create(user=self.user, name="Vegan")
+        self.ingredient = Ingredient.objects.create(user=self.user, name="Garlic")
+
+    def get_etag(self, url):
+        """Return the ETag of a GET to `url`."""
+        res = self.client.get(url)
+        self.assertEqual(res.status_code, HTTP_200_OK)
+        return res["ETag"]
+
+    def assertChangedBy(self, url, write):
+        """Assert `write` invalidates the ETag of `url`."""
+        etag = self.get_etag(url)
+        write()
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, HTTP_200_OK)
+        self.assertNotEqual(res["ETag"], etag)
+
+    def test_not_modified_on_every_collection(self):
+        """Test matching ETags get a 304 on every list and the detail view."""
+        detail = reverse("recipe:recipe-detail", args=[self.recipe.id])
+        for url in [RECIPES_URL, TAGS_URL, INGREDIENTS_URL, detail]:
+            etag = self.get_etag(url)
+
+            with self.assertNumQueries(1):
+                res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+            self.assertEqual(res.status_code, HTTP_304_NOT_MODIFIED)
+            self.assertEqual(res["ETag"], etag)
+            self.assertEqual(res.content, b"")
+
+    def test_last_modified(self):
+        """Test Last-Modified is emitted but only the ETag decides a 304."""
+        self.client.patch(
+            reverse("recipe:recipe-detail", args=[self.recipe.id]), {"title": "New"}
+        )
+        res = self.client.get(RECIPES_URL)
+
+        self.assertIn("Last-Modified", res)
+        res = self.client.get(
+            RECIPES_URL,
+            HTTP_IF_MODIFIED_SINCE=res["Last-Modified"],
+            HTTP_IF_NONE_MATCH=res["ETag"],
+        )
+        self.assertEqual(res.status_code, HTTP_304_NOT_MODIFIED)
+
+    def test_write_in_same_second(self):
+        """Test a write in the same second as a read is not answered with a 304."""
+        url = reverse("recipe:recipe-detail", args=[self.recipe.id])
+        now = timezone.now().replace(microsecond=100)
+        with patch("django.utils.timezone.now", return_value=now):
+            self.client.patch(url, {"title": "Old"})
+        res = self.client.get(RECIPES_URL)
+        later = now.replace(microsecond=900)
+        with patch("django.utils.timezone.now", return_value=later):
+            self.client.patch(url, {"title": "New"})
+
+        res = self.client.get(RECIPES_URL, HTTP_IF_MODIFIED_SINCE=res["Last-Modified"])
+
+        self.assertEqual(res.status_code, HTTP_200_OK)
+        self.assertEqual(res.data["results"][0]["title"], "New")
+
+    def test_create_recipe_changes_etag(self):
+        """Test creating a recipe invalidates the ETag."""
+        self.assertChangedBy(
+            RECIPES_URL, lambda: self.client.post(RECIPES_URL, mock_recipe())
+        )
+
+    def test_update_recipe_changes_etag(self):
+        """Test updating a recipe invalidates the ETag."""
+        url = reverse("recipe:recipe-detail", args=[self.recipe.id])
+        self.assertChangedBy(url, lambda: self.client.patch(url, {"title": "New"}))
+
+    def test_delete_recipe_changes_etag(self):
+        """Test deleting a recipe invalidates the ETag."""
+        url = reverse("recipe:recipe-detail", args=[self.recipe.id])
+        self.assertChangedBy(RECIPES_URL, lambda: self.client.delete(url))
+
+    def test_upload_image_changes_etag(self):
+        """Test uploading an image invalidates the ETag."""
+        url = reverse("recipe:recipe-upload-image", args=[self.recipe.id])
+
+        def upload():
+            with tempfile.NamedTemporaryFile(suffix=".jpg") as ntf:
+                Image.new("RGB", (10, 10)).save(ntf, format="JPEG")
+                ntf.seek(0)
+                self.client.post(url, {"image": ntf}, format="multipart")
+
+        self.assertChangedBy(RECIPES_URL, upload)
+        self.recipe.refresh_from_db()
+        self.recipe.image.delete()
+
+    def test_update_tag_changes_etag(self):
+        """Test renaming a tag invalidates recipe and tag ETags."""
+        url = reverse("recipe:tag-detail", args=[self.tag.id])
+        self.assertChangedBy(TAGS_URL, lambda: self.client.patch(url, {"name": "A"}))
+        self.assertChangedBy(RECIPES_URL, lambda: self.client.patch(url, {"name": "B"}))
+
+    def test_delete_ingredient_changes_etag(self):
+        """Test deleting an ingredient invalidates the ETag."""
+        url = reverse("recipe:ingredient-detail", args=[self.ingredient.id])
+        self.assertChangedBy(INGREDIENTS_URL, lambda: self.client.delete(url))
+
+    def test_other_users_writes_ignored(self):
+        """Test another user's writes do not invalidate the ETag."""
+        other = APIClient()
+        other.force_authenticate(create_user(**mock_user()))
+        etag = self.get_etag(RECIPES_URL)
+
+        other.post(RECIPES_URL, mock_recipe())
+        res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, HTTP_304_NOT_MODIFIED)
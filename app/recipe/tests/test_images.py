@@ -0,0 +1,100 @@
+"""
+Tests for recipe image derivatives.
+"""
+import io
+
+from PIL import Image
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import SimpleTestCase
+
+from recipe.images import (
+    DERIVATIVE_FORMATS,
+    DERIVATIVE_SIZES,
+    ORIENTATION,
+    derivative_names,
+    generate_derivatives,
+    image_metadata,
+    placeholder,
+)
+
+
+def jpeg_file(size=(600, 300), orientation=None):
+    """Return a JPEG of `size`, where orientation 6 means rotated clockwise."""
+    exif = Image.Exif()
+    if orientation:
+        exif[ORIENTATION] = orientation
+    buffer = io.BytesIO()
+    Image.new("RGB", size, "red").save(buffer, "JPEG", exif=exif)
+    return ContentFile(buffer.getvalue(), name="test.jpg")
+
+
+def save_image(size=(600, 300), orientation=None):
+    """Save a JPEG of `size` to storage and return its name."""
+    return default_storage.save("uploads/recipe/test.jpg", jpeg_file(size, orientation))
+
+
+def delete_image(name):
+    """Delete an image and its derivatives from storage."""
+    for _, _, path in derivative_names(name):
+        default_storage.delete(path)
+    default_storage.delete(name)
+
+
+class ImageDerivativeTests(SimpleTestCase):
+    """Test generating image derivatives."""
+
+    def test_derivative_names(self):
+        """Test derivatives live next to the original, one per size and format."""
+        names = list(derivative_names("uploads/recipe/abc.png"))
+
+        self.assertEqual(len(names), len(DERIVATIVE_SIZES) * len(DERIVATIVE_FORMATS))
+        self.assertIn(
+            ("thumb", "webp", "uploads/recipe/derivatives/abc-thumb.webp"), names
+        )
+
+    def test_generate_derivatives(self):
+        """Test derivatives fit their size, follow EXIF and drop metadata."""
+        name = save_image(orientation=6)
+        self.addCleanup(delete_image, name)
+
+        written = generate_derivatives(name)
+
+        self.assertEqual(len(written), len(DERIVATIVE_SIZES) * len(DERIVATIVE_FORMATS))
+        for size, fmt, path in derivative_names(name):
+            with default_storage.open(path) as file, Image.open(file) as image:
+                self.assertEqual(image.format, DERIVATIVE_FORMATS[fmt][0])
+                self.assertLessEqual(max(image.size), DERIVATIVE_SIZES[size])
+                # The 600x300 original is rotated to portrait.
+                self.assertGreater(image.height, image.width)
+                self.assertNotIn(ORIENTATION, image.getexif())
+
+    def test_generate_derivatives_keeps_existing(self):
+        """Test existing derivatives are only replaced when overwriting."""
+        name = save_image()
+        self.addCleanup(delete_image, name)
+        generate_derivatives(name)
+
+        self.assertEqual(generate_derivatives(name, overwrite=False), [])
+
+    def test_placeholder(self):
+        """Test the placeholder encodes its components and average colour."""
+        blurhash = placeholder(Image.new("RGB", (40, 30), (255, 0, 0)))
+
+        # Size flag of 4x3 components, then 0xFF0000 in base 83 after the
+        # quantised maximum, then 2 characters per AC component.
+        self.assertEqual(blurhash[0], "L")
+        self.assertEqual(blurhash[2:6], "TI:j")
+        self.assertEqual(len(blurhash), 4 + 2 * 4 * 3)
+
+    def test_image_metadata(self):
+        """Test metadata gives the dimensions of the image as displayed."""
+        file = jpeg_file(size=(600, 300), orientation=6)
+
+        metadata = image_metadata(file)
+
+        self.assertEqual(metadata["image_width"], 300)
+        self.assertEqual(metadata["image_height"], 600)
+        self.assertEqual(metadata["image_size"], file.size)
+        self.assertEqual(len(metadata["image_placeholder"]), 28)
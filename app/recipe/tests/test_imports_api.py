@@ -0,0 +1,217 @@
+"""
+Tests for recipe import jobs.
+"""
+import json
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.status import (
+    HTTP_200_OK,
+    HTTP_201_CREATED,
+    HTTP_400_BAD_REQUEST,
+    HTTP_401_UNAUTHORIZED,
+)
+from rest_framework.test import APIClient
+
+from core.models import ImportJob, Recipe, Tag
+from core.constants.mock_data import mock_user, john_doe
+
+from recipe.imports import RecipeImporter, ClaimLost
+
+IMPORTS_URL = reverse("recipe:importjob-list")
+
+WORKER = "test-worker"
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def detail_url(job_id):
+    """Return import job detail URL."""
+    return reverse("recipe:importjob-detail", args=[job_id])
+
+
+def create_user(**params):
+    """Helper function to create a new user."""
+    return get_user_model().objects.create_user(**params)
+
+
+def ndjson_file(*items, name="recipes.ndjson"):
+    """Return an uploaded NDJSON file holding `items`."""
+    lines = [item if isinstance(item, str) else json.dumps(item) for item in items]
+    return SimpleUploadedFile(name, "\n".join(lines).encode())
+
+
+def recipe_payload(**params):
+    """Return a minimal recipe payload."""
+    return {"title": "Soup", "time_minutes": 10, "price": "2.50", **params}
+
+
+def create_job(user, file, **params):
+    """Create an import job claimed by the test worker."""
+    params.setdefault("format", ImportJob.NDJSON)
+    return ImportJob.objects.create(
+        user=user, file=file, status=ImportJob.RUNNING, worker=WORKER, **params
+    )
+
+
+class PublicImportApiTests(TestCase):
+    """Test unauthenticated import API requests."""
+
+    def test_auth_required(self):
+        """Test auth is required to call API."""
+        res = APIClient().get(IMPORTS_URL)
+
+        self.assertEqual(res.status_code, HTTP_401_UNAUTHORIZED)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class PrivateImportApiTests(TestCase):
+    """Test authenticated import API requests."""
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(**john_doe)
+        self.client.force_authenticate(self.user)
+
+    def test_create_import(self):
+        """Test uploading a file queues a job right away."""
+        file = ndjson_file(recipe_payload())
+        res = self.client.post(IMPORTS_URL, {"file": file}, format="multipart")
+
+        self.assertEqual(res.status_code, HTTP_201_CREATED)
+        job = ImportJob.objects.get(id=res.data["id"])
+        self.assertEqual(job.user, self.user)
+        self.assertEqual(job.format, ImportJob.NDJSON)
+        self.assertEqual(job.status, ImportJob.PENDING)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_create_import_unknown_format(self):
+        """Test the format must be given or inferable."""
+        file = SimpleUploadedFile("recipes.txt", b"")
+        res = self.client.post(IMPORTS_URL, {"file": file}, format="multipart")
+
+        self.assertEqual(res.status_code, HTTP_400_BAD_REQUEST)
+
+    def test_list_limited_to_user(self):
+        """Test jobs are listed for the authenticated user only."""
+        create_job(self.user, ndjson_file())
+        create_job(create_user(**mock_user()), ndjson_file())
+
+        res = self.client.get(IMPORTS_URL)
+
+        self.assertEqual(res.status_code, HTTP_200_OK)
+        self.assertEqual(len(res.data), 1)
+        self.assertNotIn("errors", res.data[0])
+
+    def test_retrieve_import_errors(self):
+        """Test the job detail reports progress and row errors."""
+        job = create_job(self.user, ndjson_file(recipe_payload(), "{oops"))
+        RecipeImporter(job, WORKER).run()
+
+        res = self.client.get(detail_url(job.id))
+
+        self.assertEqual(res.status_code, HTTP_200_OK)
+        self.assertEqual(res.data["status"], ImportJob.DONE)
+        self.assertEqual(res.data["processed_rows"], 2)
+        self.assertEqual(res.data["created_rows"], 1)
+        self.assertEqual(res.data["failed_rows"], 1)
+        self.assertEqual(res.data["errors"][0]["row"], 2)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class RecipeImporterTests(TestCase):
+    """Test processing import jobs."""
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.user = create_user(**john_doe)
+
+    def test_import_ndjson(self):
+        """Test recipes are created in batches with their tags."""
+        items = [
+            recipe_payload(id=99, title=f"Recipe {i}", tags=[{"name": "Vegan"}])
+            for i in range(5)
+        ]
+        job = create_job(self.user, ndjson_file(*items))
+
+        RecipeImporter(job, WORKER, batch_size=2).run()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportJob.DONE)
+        self.assertEqual(job.created_rows, 5)
+        self.assertIsNotNone(job.finished)
+        recipes = Recipe.objects.filter(user=self.user)
+        self.assertEqual(recipes.count(), 5)
+        self.assertEqual(Tag.objects.get(user=self.user).recipe_set.count(), 5)
+
+    def test_import_deletes_file(self):
+        """Test the uploaded file is deleted once the job is done or failed."""
+        done = create_job(self.user, ndjson_file(recipe_payload()))
+        failed = create_job(self.user, SimpleUploadedFile("bad.ndjson", b"\xff"))
+        names = [done.file.name, failed.file.name]
+
+        RecipeImporter(done, WORKER).run()
+        with self.assertRaises(UnicodeDecodeError):
+            RecipeImporter(failed, WORKER).run()
+
+        for job, status in [(done, ImportJob.DONE), (failed, ImportJob.FAILED)]:
+            job.refresh_from_db()
+            self.assertEqual(job.status, status)
+            self.assertFalse(job.file)
+        for name in names:
+            self.assertFalse(default_storage.exists(name), name)
+
+    def test_import_csv(self):
+        """Test CSV rows split relation names on '|'."""
+        content = (
+            "title,time_minutes,price,tags,ingredients\n"
+            "Soup,10,2.50,Vegan|Quick,Garlic\n"
+            "Stew,,3.00,,\n"
+        )
+        file = SimpleUploadedFile("recipes.csv", content.encode())
+        job = create_job(self.user, file, format=ImportJob.CSV)
+
+        RecipeImporter(job, WORKER).run()
+
+        job.refresh_from_db()
+        self.assertEqual((job.created_rows, job.failed_rows), (1, 1))
+        self.assertIn("time_minutes", job.errors[0]["errors"])
+        soup = Recipe.objects.get(user=self.user)
+        self.assertEqual(
+            sorted(soup.tags.values_list("name", flat=True)), ["Quick", "Vegan"]
+        )
+
+    def test_import_resumes_after_processed_rows(self):
+        """Test a resumed job skips the rows already committed."""
+        file = ndjson_file(recipe_payload(title="Done"), recipe_payload(title="Next"))
+        job = create_job(self.user, file, processed_rows=1)
+
+        RecipeImporter(job, WORKER).run()
+
+        titles = list(Recipe.objects.values_list("title", flat=True))
+        self.assertEqual(titles, ["Next"])
+
+    def test_import_stops_when_claim_lost(self):
+        """Test a worker stops writing once another worker took the job."""
+        job = create_job(self.user, ndjson_file(recipe_payload()))
+        ImportJob.objects.filter(id=job.id).update(worker="other-worker")
+
+        with self.assertRaises(ClaimLost):
+            RecipeImporter(job, WORKER).run()
+
+        self.assertFalse(Recipe.objects.exists())
@@ -19,6 +19,9 @@ from recipe.serializers import IngredientSerializer
 from core.constants.mock_data import mock_user, john_doe, mock_ingredient, mock_recipe
 
 INGREDIENTS_URL = reverse("recipe:ingredient-list")
+AUTOCOMPLETE_URL = reverse("recipe:ingredient-autocomplete")
+BULK_DELETE_URL = reverse("recipe:ingredient-bulk-delete")
+BULK_RENAME_URL = reverse("recipe:ingredient-bulk-rename")
 
 
 def get_detail_url(ingredient_id):
@@ -126,3 +129,52 @@ class PrivateIngredientsApiTests(TestCase):
         res = self.client.get(INGREDIENTS_URL, {"assigned_only": 1})
 
         self.assertEqual(len(res.data), 1)
+
+    def test_list_ingredients_with_recipe_count(self):
+        """Test ingredients can be listed with their recipe counts."""
+        i1 = Ingredient.objects.create(user=self.user, name="Salt")
+        Recipe.objects.create(user=self.user, **mock_recipe()).ingredients.add(i1)
+
+        res = self.client.get(INGREDIENTS_URL, {"recipe_count": 1, "assigned_only": 1})
+
+        self.assertEqual(res.status_code, HTTP_200_OK)
+        self.assertEqual(res.data, [{"id": i1.id, "name": "Salt", "recipe_count": 1}])
+
+    def test_autocomplete_ingredients(self):
+        """Test autocomplete suggests matching ingredients, prefixes first."""
+        Ingredient.objects.create(user=self.user, name="Red Pepper")
+        Ingredient.objects.create(user=self.user, name="Pepper")
+        Ingredient.objects.create(user=self.user, name="Salt")
+
+        res = self.client.get(AUTOCOMPLETE_URL, {"q": "pep"})
+
+        self.assertEqual(res.status_code, HTTP_200_OK)
+        names = [ingredient["name"] for ingredient in res.data]
+        self.assertEqual(names[0], "Pepper")
+        self.assertIn("Red Pepper", names)
+        self.assertNotIn("Salt", names)
+
+    def test_bulk_delete_ingredients(self):
+        """Test deleting many ingredients in one request."""
+        i1 = Ingredient.objects.create(user=self.user, name="Salt")
+        i2 = Ingredient.objects.create(user=self.user, name="Pepper")
+        recipe = Recipe.objects.create(user=self.user, **mock_recipe())
+        recipe.ingredients.add(i1, i2)
+
+        res = self.client.post(BULK_DELETE_URL, {"ids": [i1.id, i2.id]}, format="json")
+
+        self.assertEqual(res.status_code, HTTP_200_OK)
+        self.assertEqual(res.data, {"deleted": 2, "unlinked": 2})
+        self.assertFalse(Ingredient.objects.exists())
+
+    def test_bulk_rename_ingredients(self):
+        """Test renaming many ingredients in one request."""
+        salt = Ingredient.objects.create(user=self.user, name="Salt")
+
+        payload = {"items": [{"id": salt.id, "name": "Sea salt"}]}
+        res = self.client.post(BULK_RENAME_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, HTTP_200_OK)
+        self.assertEqual(res.data, {"renamed": 1})
+        salt.refresh_from_db()
+        self.assertEqual(salt.name, "Sea salt")
@@ -0,0 +1,156 @@
+"""
+Tests for serving recipe media.
+"""
+import os
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.status import (
+    HTTP_200_OK,
+    HTTP_206_PARTIAL_CONTENT,
+    HTTP_304_NOT_MODIFIED,
+    HTTP_401_UNAUTHORIZED,
+    HTTP_404_NOT_FOUND,
+    HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+)
+from rest_framework.test import APIClient
+
+from core.models import Recipe
+from core.constants.mock_data import mock_user, mock_recipe, john_doe
+
+from recipe.images import derivative_names
+from recipe.media import MEDIA_CACHE_CONTROL, media_etag
+
+CONTENT = b"0123456789"
+
+
+def media_url(name):
+    """Return URL serving media `name`."""
+    return reverse("media", kwargs={"name": name})
+
+
+def create_user(**params):
+    """Helper function to create a new user."""
+    return get_user_model().objects.create_user(**params)
+
+
+class PublicMediaTests(TestCase):
+    """Test unauthenticated media requests."""
+
+    def test_auth_required(self):
+        """Test auth is required to fetch media."""
+        res = APIClient().get(media_url("uploads/recipe/photo.jpg"))
+
+        self.assertEqual(res.status_code, HTTP_401_UNAUTHORIZED)
+
+
+@override_settings(MEDIA_SENDFILE="")
+class PrivateMediaTests(TestCase):
+    """Test serving media to the users owning it."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(**john_doe)
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(user=self.user, **mock_recipe())
+        self.recipe.image.save("photo.jpg", ContentFile(CONTENT))
+        self.name = self.recipe.image.name
+
+    def tearDown(self):
+        self.recipe.image.delete()
+
+    def test_serve_image(self):
+        """Test the owner gets the image with immutable cache headers."""
+        res = self.client.get(media_url(self.name), HTTP_ACCEPT="image/webp")
+
+        self.assertEqual(res.status_code, HTTP_200_OK)
+        self.assertEqual(b"".join(res.streaming_content), CONTENT)
+        self.assertEqual(res["Content-Type"], "image/jpeg")
+        self.assertEqual(res["ETag"], media_etag(self.name))
+        self.assertEqual(res["Cache-Control"], MEDIA_CACHE_CONTROL)
+        self.assertEqual(res["Accept-Ranges"], "bytes")
+
+    def test_serve_derivative(self):
+        """Test the owner gets the derivatives of the image."""
+        _, _, name = next(derivative_names(self.name))
+        default_storage.save(name, ContentFile(CONTENT))
+        self.addCleanup(default_storage.delete, name)
+
+        res = self.client.get(media_url(name))
+
+        self.assertEqual(res.status_code, HTTP_200_OK)
+
+    def test_other_users_image(self):
+        """Test images of other users are not found."""
+        self.client.force_authenticate(create_user(**mock_user()))
+
+        res = self.client.get(media_url(self.name))
+
+        self.assertEqual(res.status_code, HTTP_404_NOT_FOUND)
+
+    def test_outside_of_image_directory(self):
+        """Test only recipe images are served."""
+        for name in [f"uploads/recipe/../{self.name}", "uploads/imports/a.csv"]:
+            res = self.client.get(media_url(name))
+
+            self.assertEqual(res.status_code, HTTP_404_NOT_FOUND)
+
+    def test_not_modified(self):
+        """Test a client holding the image gets a 304."""
+        etag = media_etag(self.name)
+
+        res = self.client.get(media_url(self.name), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res["ETag"], etag)
+
+    def test_range(self):
+        """Test single byte ranges are served as partial content."""
+        url = media_url(self.name)
+        cases = [("bytes=2-4", b"234", "2-4"), ("bytes=-3", b"789", "7-9")]
+        for header, content, served in cases:
+            res = self.client.get(url, HTTP_RANGE=header)
+
+            self.assertEqual(res.status_code, HTTP_206_PARTIAL_CONTENT)
+            self.assertEqual(b"".join(res.streaming_content), content)
+            self.assertEqual(res["Content-Range"], f"bytes {served}/10")
+
+    def test_range_not_satisfiable(self):
+        """Test ranges past the end of the file are refused."""
+        res = self.client.get(media_url(self.name), HTTP_RANGE="bytes=10-")
+
+        self.assertEqual(res.status_code, HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+        self.assertEqual(res["Content-Range"], "bytes */10")
+
+    def test_range_if_range_mismatch(self):
+        """Test a stale If-Range gets the whole file."""
+        res = self.client.get(
+            media_url(self.name), HTTP_RANGE="bytes=2-4", HTTP_IF_RANGE='"stale"'
+        )
+
+        self.assertEqual(res.status_code, HTTP_200_OK)
+        self.assertEqual(b"".join(res.streaming_content), CONTENT)
+
+    @override_settings(MEDIA_SENDFILE="x-accel-redirect")
+    def test_x_accel_redirect(self):
+        """Test nginx is handed the transfer through its internal location."""
+        with override_settings(MEDIA_ACCEL_PREFIX="/protected/"):
+            res = self.client.get(media_url(self.name))
+
+        self.assertEqual(res.status_code, HTTP_200_OK)
+        self.assertEqual(res["X-Accel-Redirect"], f"/protected/{self.name}")
+        self.assertEqual(res.content, b"")
+        self.assertEqual(res["Content-Type"], "image/jpeg")
+
+    @override_settings(MEDIA_SENDFILE="x-sendfile")
+    def test_x_sendfile(self):
+        """Test the proxy is handed the path of the file."""
+        res = self.client.get(media_url(self.name))
+
+        self.assertEqual(res["X-Sendfile"], self.recipe.image.path)
+        self.assertTrue(os.path.isabs(res["X-Sendfile"]))
+        self.assertEqual(res.content, b"")
@@ -0,0 +1,96 @@
+"""
+Tests for the recipe fast read path.
+"""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db.models import Prefetch
+from django.test import TestCase
+
+from rest_framework.renderers import JSONRenderer
+
+from core.models import Recipe, Tag, Ingredient
+from core.constants.mock_data import john_doe, mock_recipe
+from recipe.readers import RecipeListReader
+from recipe.search import search_recipes
+from recipe.serializers import RecipeSerializer
+
+
+def create_user(**params):
+    """Create and return a new user."""
+    return get_user_model().objects.create_user(**params)
+
+
+class RecipeListReaderParityTests(TestCase):
+    """Test the reader renders byte identical output to RecipeSerializer."""
+
+    def setUp(self):
+        self.user = create_user(**john_doe)
+        tags = [Tag.objects.create(user=self.user, name=n) for n in "CAB"]
+        ingredients = [
+            Ingredient.objects.create(user=self.user, name=n) for n in ["Salt", "Oil"]
+        ]
+        plain = Recipe.objects.create(
+            user=self.user, **mock_recipe(price=Decimal("0.5"), link="")
+        )
+        tagged = Recipe.objects.create(
+            user=self.user, **mock_recipe(title="Spicy «curry» ☕", price=999.99)
+        )
+        tagged.tags.add(tags[2], tags[0], tags[1])
+        tagged.ingredients.add(ingredients[1], ingredients[0])
+        self.recipes = [plain, tagged]
+        other_user = create_user(email="other@example.com", username="other")
+        Recipe.objects.create(user=other_user, **mock_recipe())
+
+    def queryset(self):
+        """Return the user's recipes ordered like the list endpoint."""
+        return Recipe.objects.filter(user=self.user).order_by("-id")
+
+    def assertParity(self, queryset=None, fields=None, expand=None):
+        """Assert both paths render the same JSON bytes."""
+        queryset = self.queryset() if queryset is None else queryset
+        prefetched = queryset.prefetch_related(
+            Prefetch("tags", queryset=Tag.objects.order_by("id")),
+            Prefetch("ingredients", queryset=Ingredient.objects.order_by("id")),
+        )
+        expected = RecipeSerializer(
+            prefetched, many=True, fields=fields, expand=expand
+        ).data
+        reader = RecipeListReader(fields, expand)
+        actual = reader.serialize(list(reader.values(queryset)))
+
+        renderer = JSONRenderer()
+        self.assertEqual(renderer.render(actual), renderer.render(expected))
+
+    def test_default_fields(self):
+        """Test parity with every field and nested relations."""
+        self.assertParity()
+
+    def test_selected_fields(self):
+        """Test parity when only scalar fields are selected."""
+        self.assertParity(fields=["title", "price", "id"])
+
+    def test_relation_ids(self):
+        """Test parity when relations are represented by IDs."""
+        self.assertParity(fields=["id", "tags", "ingredients"])
+
+    def test_partially_expanded(self):
+        """Test parity when only some relations are expanded."""
+        self.assertParity(fields=["id", "tags", "ingredients"], expand=["tags"])
+
+    def test_search_annotation(self):
+        """Test parity for ranked search results."""
+        queryset = search_recipes(self.queryset(), "curry")
+        self.assertParity(queryset.order_by("-search_rank", "-id"))
+
+    def test_empty(self):
+        """Test parity for an empty result."""
+        self.assertParity(self.queryset().none())
+
+    def test_relation_queries(self):
+        """Test the reader runs one query per included relation."""
+        reader = RecipeListReader()
+        rows = list(reader.values(self.queryset()))
+
+        with self.assertNumQueries(2):
+            reader.serialize(rows)
@@ -2,19 +2,28 @@
 Tests for the tags API
 """
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
-from rest_framework.status import HTTP_200_OK, HTTP_401_UNAUTHORIZED
+from rest_framework.status import (
+    HTTP_200_OK,
+    HTTP_400_BAD_REQUEST,
+    HTTP_401_UNAUTHORIZED,
+)
 
 from rest_framework.test import APIClient
 
-from core.models import Tag, Recipe
+from core.models import Tag, Recipe, CollectionVersion
 from core.constants.mock_data import mock_tag, mock_user, john_doe, mock_recipe
 from recipe.serializers import TagSerializer
 
 
 TAGS_URL = reverse("recipe:tag-list")
+AUTOCOMPLETE_URL = reverse("recipe:tag-autocomplete")
+BULK_DELETE_URL = reverse("recipe:tag-bulk-delete")
+BULK_RENAME_URL = reverse("recipe:tag-bulk-rename")
 
 
 def detail_url(tag_id):
@@ -50,8 +59,8 @@ class PrivateTagsApiTests(TestCase):
 
     def test_retrieve_tags(self):
         """Test retrieving tags."""
-        Tag.objects.create(user=self.user, **mock_tag())
-        Tag.objects.create(user=self.user, **mock_tag())
+        Tag.objects.create(user=self.user, **mock_tag(idx=0))
+        Tag.objects.create(user=self.user, **mock_tag(idx=1))
 
         res = self.client.get(TAGS_URL)
 
@@ -119,3 +128,203 @@ class PrivateTagsApiTests(TestCase):
         res = self.client.get(TAGS_URL, {"assigned_only": 1})
 
         self.assertEqual(len(res.data), 1)
+
+    def test_assigned_only_uses_recipe_count(self):
+        """Test assigned tags are filtered on the counter, without a join."""
+        Tag.objects.create(user=self.user, name="Tag 1")
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(TAGS_URL, {"assigned_only": 1})
+
+        sql = next(
+            q["sql"] for q in ctx.captured_queries if 'FROM "core_tag"' in q["sql"]
+        )
+        self.assertIn('"recipe_count" > 0', sql)
+        self.assertNotIn("core_recipe_tags", sql)
+        self.assertNotIn("DISTINCT", sql)
+
+    def test_recipe_count_follows_links(self):
+        """Test tag counters follow recipe updates and deletions."""
+        t1 = Tag.objects.create(user=self.user, name="Tag 1")
+        t2 = Tag.objects.create(user=self.user, name="Tag 2")
+        r1 = Recipe.objects.create(user=self.user, **mock_recipe())
+        r2 = Recipe.objects.create(user=self.user, **mock_recipe())
+        r1.tags.add(t1, t2)
+        r2.tags.add(t1)
+
+        recipe_url = reverse("recipe:recipe-detail", args=[r1.id])
+        self.client.patch(recipe_url, {"tags": [{"name": "Tag 2"}]}, format="json")
+        t1.refresh_from_db()
+        self.assertEqual(t1.recipe_count, 1)
+
+        r2.delete()
+        t1.refresh_from_db()
+        t2.refresh_from_db()
+        self.assertEqual((t1.recipe_count, t2.recipe_count), (0, 1))
+
+    def test_order_tags_by_recipe_count(self):
+        """Test tags can be sorted by popularity."""
+        t1 = Tag.objects.create(user=self.user, name="Tag 1")
+        t2 = Tag.objects.create(user=self.user, name="Tag 2")
+        Recipe.objects.create(user=self.user, **mock_recipe()).tags.add(t2)
+
+        res = self.client.get(TAGS_URL, {"ordering": "-recipe_count"})
+
+        self.assertEqual([tag["id"] for tag in res.data], [t2.id, t1.id])
+
+    def test_invalid_ordering(self):
+        """Test unknown orderings are rejected."""
+        res = self.client.get(TAGS_URL, {"ordering": "user"})
+
+        self.assertEqual(res.status_code, HTTP_400_BAD_REQUEST)
+
+    def test_list_tags_with_recipe_count(self):
+        """Test recipe counts are returned in the list query."""
+        t1 = Tag.objects.create(user=self.user, name="Tag 1")
+        Tag.objects.create(user=self.user, name="Tag 2")
+        for _ in range(2):
+            Recipe.objects.create(user=self.user, **mock_recipe()).tags.add(t1)
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(TAGS_URL, {"recipe_count": 1})
+
+        self.assertEqual(res.status_code, HTTP_200_OK)
+        counts = {tag["name"]: tag["recipe_count"] for tag in res.data}
+        self.assertEqual(counts, {"Tag 1": 2, "Tag 2": 0})
+        tag_queries = [q for q in ctx.captured_queries if "core_tag" in q["sql"]]
+        self.assertEqual(len(tag_queries), 1)
+
+    def test_list_tags_without_recipe_count(self):
+        """Test recipe counts are only returned when requested."""
+        Tag.objects.create(user=self.user, name="Tag 1")
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertNotIn("recipe_count", res.data[0])
+
+    def test_autocomplete_prefix_first(self):
+        """Test autocomplete lists prefix matches before other matches."""
+        Tag.objects.create(user=self.user, name="Sweet and sour")
+        Tag.objects.create(user=self.user, name="Sweden")
+        Tag.objects.create(user=self.user, name="Dessert")
+        Tag.objects.create(user=self.user, name="Vegan")
+
+        res = self.client.get(AUTOCOMPLETE_URL, {"q": "swe"})
+
+        self.assertEqual(res.status_code, HTTP_200_OK)
+        names = [tag["name"] for tag in res.data]
+        self.assertEqual(names[:2], ["Sweden", "Sweet and sour"])
+        self.assertNotIn("Vegan", names)
+
+    def test_autocomplete_limit(self):
+        """Test autocomplete returns at most `limit` suggestions."""
+        for i in range(5):
+            Tag.objects.create(user=self.user, name=f"Spicy {i}")
+
+        res = self.client.get(AUTOCOMPLETE_URL, {"q": "spi", "limit": 2})
+
+        self.assertEqual(len(res.data), 2)
+
+    def test_autocomplete_limited_to_user(self):
+        """Test autocomplete only suggests the authenticated user's tags."""
+        user2 = create_user(**mock_user())
+        Tag.objects.create(user=user2, name="Spicy")
+
+        res = self.client.get(AUTOCOMPLETE_URL, {"q": "spi"})
+
+        self.assertEqual(res.data, [])
+
+    def test_autocomplete_empty_query(self):
+        """Test autocomplete without a query returns no suggestions."""
+        Tag.objects.create(user=self.user, name="Spicy")
+
+        res = self.client.get(AUTOCOMPLETE_URL)
+
+        self.assertEqual(res.status_code, HTTP_200_OK)
+        self.assertEqual(res.data, [])
+
+    def test_autocomplete_invalid_limit(self):
+        """Test autocomplete rejects a non numeric limit."""
+        res = self.client.get(AUTOCOMPLETE_URL, {"q": "spi", "limit": "many"})
+
+        self.assertEqual(res.status_code, HTTP_400_BAD_REQUEST)
+
+    def test_bulk_delete(self):
+        """Test deleting many tags unlinks them from recipes."""
+        tags = [Tag.objects.create(user=self.user, name=f"Tag {i}") for i in range(3)]
+        other = Tag.objects.create(user=create_user(**mock_user()), name="Other")
+        recipe = Recipe.objects.create(user=self.user, **mock_recipe())
+        recipe.tags.add(*tags)
+
+        ids = [tags[0].id, tags[1].id, other.id]
+        res = self.client.post(BULK_DELETE_URL, {"ids": ids}, format="json")
+
+        self.assertEqual(res.status_code, HTTP_200_OK)
+        self.assertEqual(res.data, {"deleted": 2, "unlinked": 2})
+        self.assertEqual(list(recipe.tags.all()), [tags[2]])
+        self.assertTrue(Tag.objects.filter(id=other.id).exists())
+        self.assertEqual(CollectionVersion.objects.for_user(self.user)[0], 1)
+
+    def test_bulk_delete_invalid(self):
+        """Test bulk delete requires a non empty list of IDs."""
+        res = self.client.post(BULK_DELETE_URL, {"ids": []}, format="json")
+
+        self.assertEqual(res.status_code, HTTP_400_BAD_REQUEST)
+
+    def test_bulk_rename(self):
+        """Test renaming many tags in one request."""
+        spicy = Tag.objects.create(user=self.user, name="Spicy")
+        sweet = Tag.objects.create(user=self.user, name="Sweet")
+        other = Tag.objects.create(user=create_user(**mock_user()), name="Other")
+
+        payload = {
+            "items": [
+                {"id": spicy.id, "name": "Hot"},
+                {"id": sweet.id, "name": "Sugary"},
+                {"id": other.id, "name": "Mine"},
+            ]
+        }
+        res = self.client.post(BULK_RENAME_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, HTTP_200_OK)
+        self.assertEqual(res.data, {"renamed": 2})
+        spicy.refresh_from_db()
+        sweet.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual((spicy.name, sweet.name), ("Hot", "Sugary"))
+        self.assertEqual(other.name, "Other")
+
+    def test_bulk_rename_duplicate_id(self):
+        """Test an object can only be renamed once per request."""
+        tag = Tag.objects.create(user=self.user, name="Spicy")
+        items = [{"id": tag.id, "name": "Hot"}, {"id": tag.id, "name": "Mild"}]
+
+        res = self.client.post(BULK_RENAME_URL, {"items": items}, format="json")
+
+        self.assertEqual(res.status_code, HTTP_400_BAD_REQUEST)
+        tag.refresh_from_db()
+        self.assertEqual(tag.name, "Spicy")
+
+    def test_update_tag_duplicate_name(self):
+        """Test renaming a tag to an existing name in another case fails."""
+        Tag.objects.create(user=self.user, name="Vegan")
+        tag = Tag.objects.create(user=self.user, name="Spicy")
+
+        res = self.client.patch(detail_url(tag.id), {"name": "vegan"})
+
+        self.assertEqual(res.status_code, HTTP_400_BAD_REQUEST)
+        tag.refresh_from_db()
+        self.assertEqual(tag.name, "Spicy")
+
+    def test_bulk_rename_duplicate_name(self):
+        """Test a bulk rename colliding with an existing name changes nothing."""
+        Tag.objects.create(user=self.user, name="Vegan")
+        spicy = Tag.objects.create(user=self.user, name="Spicy")
+        sweet = Tag.objects.create(user=self.user, name="Sweet")
+        items = [{"id": spicy.id, "name": "Hot"}, {"id": sweet.id, "name": "VEGAN"}]
+
+        res = self.client.post(BULK_RENAME_URL, {"items": items}, format="json")
+
+        self.assertEqual(res.status_code, HTTP_400_BAD_REQUEST)
+        spicy.refresh_from_db()
+        self.assertEqual(spicy.name, "Spicy")
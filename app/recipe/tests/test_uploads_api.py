@@ -0,0 +1,276 @@
+"""
+Tests for chunked recipe image uploads.
+"""
+import io
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest.mock import patch
+
+from PIL import Image
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework.status import (
+    HTTP_200_OK,
+    HTTP_201_CREATED,
+    HTTP_400_BAD_REQUEST,
+    HTTP_404_NOT_FOUND,
+    HTTP_409_CONFLICT,
+    HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+)
+from rest_framework.test import APIClient
+
+from core.models import ImageUpload, Recipe
+from core.constants.mock_data import mock_user, mock_recipe, john_doe
+
+from recipe.uploads import partial_path
+
+UPLOAD_ROOT = tempfile.mkdtemp()
+
+
+def uploads_url(recipe_id):
+    """Return URL starting a chunked upload for a recipe."""
+    return reverse("recipe:recipe-start-upload", args=[recipe_id])
+
+
+def chunk_url(recipe_id, upload_id):
+    """Return URL of a chunked upload."""
+    return reverse("recipe:recipe-upload-chunk", args=[recipe_id, upload_id])
+
+
+def finalize_url(recipe_id, upload_id):
+    """Return URL finalizing a chunked upload."""
+    return reverse("recipe:recipe-finish-upload", args=[recipe_id, upload_id])
+
+
+def create_user(**params):
+    """Helper function to create a new user."""
+    return get_user_model().objects.create_user(**params)
+
+
+def jpeg_bytes():
+    """Return the bytes of a small JPEG image."""
+    buffer = io.BytesIO()
+    Image.new("RGB", (10, 10)).save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+@override_settings(CHUNKED_UPLOAD_ROOT=UPLOAD_ROOT)
+class ChunkedUploadTests(TestCase):
+    """Test chunked, resumable image uploads."""
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(UPLOAD_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(**john_doe)
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(user=self.user, **mock_recipe())
+        self.data = jpeg_bytes()
+
+    def tearDown(self):
+        self.recipe.refresh_from_db()
+        if self.recipe.image:
+            self.recipe.image.delete()
+
+    def start(self, size=None):
+        """Start an upload of `self.data` and return its ID."""
+        res = self.client.post(
+            uploads_url(self.recipe.id),
+            {"filename": "photo.jpg", "size": size or len(self.data)},
+        )
+        self.assertEqual(res.status_code, HTTP_201_CREATED)
+        return res.data["id"]
+
+    def put(self, upload_id, data, offset):
+        """Send a chunk of `data` at `offset`."""
+        return self.client.put(
+            chunk_url(self.recipe.id, upload_id),
+            data,
+            content_type="application/octet-stream",
+            HTTP_UPLOAD_OFFSET=str(offset),
+        )
+
+    def test_start_upload(self):
+        """Test starting an upload records its size at offset 0."""
+        upload_id = self.start()
+
+        upload = ImageUpload.objects.get(id=upload_id)
+        self.assertEqual(upload.user, self.user)
+        self.assertEqual(upload.recipe, self.recipe)
+        self.assertEqual(upload.size, len(self.data))
+        self.assertEqual(upload.offset, 0)
+
+    @override_settings(MAX_IMAGE_UPLOAD_SIZE=10)
+    def test_start_upload_too_large(self):
+        """Test uploads larger than the limit are refused upfront."""
+        res = self.client.post(
+            uploads_url(self.recipe.id), {"filename": "photo.jpg", "size": 11}
+        )
+
+        self.assertEqual(res.status_code, HTTP_400_BAD_REQUEST)
+        self.assertFalse(ImageUpload.objects.exists())
+
+    @override_settings(MAX_OPEN_UPLOADS=2)
+    def test_start_upload_limit(self):
+        """Test users can only have so many uploads open, expired ones aside."""
+        first = self.start()
+        self.start()
+
+        res = self.client.post(
+            uploads_url(self.recipe.id), {"filename": "photo.jpg", "size": 10}
+        )
+        self.assertEqual(res.status_code, HTTP_400_BAD_REQUEST)
+        self.assertEqual(ImageUpload.objects.count(), 2)
+
+        ImageUpload.objects.filter(id=first).update(
+            created=timezone.now() - timedelta(days=2)
+        )
+        self.start()
+
+    @override_settings(CHUNKED_UPLOAD_TTL=60)
+    def test_expired_upload(self):
+        """Test uploads are not found once they are older than the TTL."""
+        upload_id = self.start()
+        ImageUpload.objects.filter(id=upload_id).update(
+            created=timezone.now() - timedelta(seconds=61)
+        )
+
+        res = self.put(upload_id, self.data, 0)
+
+        self.assertEqual(res.status_code, HTTP_404_NOT_FOUND)
+
+    def test_upload_in_chunks_and_finalize(self):
+        """Test chunks are appended and the finished file becomes the image."""
+        upload_id = self.start()
+        half = len(self.data) // 2
+
+        res = self.put(upload_id, self.data[:half], 0)
+        self.assertEqual(res.status_code, HTTP_200_OK)
+        self.assertEqual(res.data["offset"], half)
+        res = self.put(upload_id, self.data[half:], half)
+        self.assertEqual(res.data["offset"], len(self.data))
+        res = self.client.post(finalize_url(self.recipe.id, upload_id))
+
+        self.assertEqual(res.status_code, HTTP_200_OK)
+        self.recipe.refresh_from_db()
+        with self.recipe.image.open("rb") as file:
+            self.assertEqual(file.read(), self.data)
+        self.assertFalse(ImageUpload.objects.exists())
+        self.assertFalse(os.path.exists(os.path.join(UPLOAD_ROOT, f"{upload_id}.part")))
+
+    def test_resume_after_interrupted_chunk(self):
+        """Test the offset is reported and stray bytes of a lost chunk dropped."""
+        upload_id = self.start()
+        self.put(upload_id, self.data[:100], 0)
+        upload = ImageUpload.objects.get(id=upload_id)
+        with open(partial_path(upload), "ab") as file:
+            file.write(b"garbage")
+
+        res = self.client.get(chunk_url(self.recipe.id, upload_id))
+        self.assertEqual(res.data["offset"], 100)
+        self.put(upload_id, self.data[100:], 100)
+
+        with open(partial_path(upload), "rb") as file:
+            self.assertEqual(file.read(), self.data)
+
+    def test_resume_after_lost_partial_file(self):
+        """Test a partial file shorter than the offset is not padded with zeros."""
+        upload_id = self.start()
+        self.put(upload_id, self.data[:200], 0)
+        upload = ImageUpload.objects.get(id=upload_id)
+        with open(partial_path(upload), "r+b") as file:
+            file.truncate(150)
+
+        res = self.put(upload_id, self.data[200:], 200)
+
+        self.assertEqual(res.status_code, HTTP_409_CONFLICT)
+        self.assertEqual(res.data["offset"], 150)
+        self.assertEqual(ImageUpload.objects.get(id=upload_id).offset, 150)
+        os.remove(partial_path(upload))
+        res = self.client.post(finalize_url(self.recipe.id, upload_id))
+        self.assertEqual(res.status_code, HTTP_409_CONFLICT)
+        self.assertEqual(ImageUpload.objects.get(id=upload_id).offset, 0)
+
+    def test_chunk_read_before_lock(self):
+        """Test the request body is read before a transaction is opened."""
+        upload_id = self.start()
+        depth = len(connection.savepoint_ids)
+        depths = []
+
+        def read(stream, size):
+            depths.append(len(connection.savepoint_ids))
+            return b""
+
+        with patch("django.core.handlers.wsgi.LimitedStream.read", read):
+            self.put(upload_id, self.data, 0)
+
+        self.assertEqual(set(depths), {depth})
+
+    def test_offset_mismatch(self):
+        """Test a chunk at the wrong offset is refused with the current offset."""
+        upload_id = self.start()
+        self.put(upload_id, self.data[:100], 0)
+
+        res = self.put(upload_id, self.data[200:], 200)
+
+        self.assertEqual(res.status_code, HTTP_409_CONFLICT)
+        self.assertEqual(res.data["offset"], 100)
+
+    def test_missing_offset(self):
+        """Test a chunk without an Upload-Offset header is refused."""
+        upload_id = self.start()
+        res = self.client.put(
+            chunk_url(self.recipe.id, upload_id),
+            self.data,
+            content_type="application/octet-stream",
+        )
+
+        self.assertEqual(res.status_code, HTTP_400_BAD_REQUEST)
+
+    def test_chunk_past_size(self):
+        """Test chunks may not grow the upload past its declared size."""
+        upload_id = self.start(size=100)
+
+        res = self.put(upload_id, self.data, 0)
+
+        self.assertEqual(res.status_code, HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        self.assertEqual(ImageUpload.objects.get(id=upload_id).offset, 0)
+
+    def test_finalize_incomplete(self):
+        """Test an upload can only be finalized once every byte is received."""
+        upload_id = self.start()
+        self.put(upload_id, self.data[:100], 0)
+
+        res = self.client.post(finalize_url(self.recipe.id, upload_id))
+
+        self.assertEqual(res.status_code, HTTP_409_CONFLICT)
+        self.recipe.refresh_from_db()
+        self.assertFalse(self.recipe.image)
+
+    def test_finalize_invalid_image(self):
+        """Test a finished upload that is not an image is rejected."""
+        upload_id = self.start(size=9)
+        self.put(upload_id, b"notimage!", 0)
+
+        res = self.client.post(finalize_url(self.recipe.id, upload_id))
+
+        self.assertEqual(res.status_code, HTTP_400_BAD_REQUEST)
+
+    def test_other_users_upload(self):
+        """Test uploads of other users are not found."""
+        upload_id = self.start()
+        self.client.force_authenticate(create_user(**mock_user()))
+
+        res = self.client.get(chunk_url(self.recipe.id, upload_id))
+
+        self.assertEqual(res.status_code, HTTP_404_NOT_FOUND)
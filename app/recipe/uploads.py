@@ -0,0 +1,97 @@
+"""
+Chunked, resumable uploads of recipe images.
+"""
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+
+# Bytes read from the request and written to disk at a time, and the size
+# past which a chunk is spooled to disk rather than held in memory.
+CHUNK_READ_SIZE = 64 * 1024
+CHUNK_SPOOL_SIZE = 1024 * 1024
+
+
+class OffsetMismatch(Exception):
+    """Raised when a chunk does not start where the upload stopped."""
+
+
+class UploadTooLarge(Exception):
+    """Raised when a chunk would grow the upload past its declared size."""
+
+
+def partial_path(upload):
+    """Return the path of the file assembling `upload`."""
+    return os.path.join(settings.CHUNKED_UPLOAD_ROOT, f"{upload.id}.part")
+
+
+def partial_size(upload):
+    """Return the number of bytes in the partial file of `upload`."""
+    try:
+        return os.path.getsize(partial_path(upload))
+    except FileNotFoundError:
+        return 0
+
+
+def spool_chunk(upload, offset, stream):
+    """
+    Return a temporary file holding the chunk of `upload` read from `stream`.
+
+    The request body is read `CHUNK_READ_SIZE` bytes at a time before any
+    lock is taken, so a slow client does not hold a database transaction
+    open. Chunks past `CHUNK_SPOOL_SIZE` bytes are spooled to disk. The
+    caller closes the file.
+    """
+    if offset != upload.offset:
+        raise OffsetMismatch(upload.offset)
+
+    os.makedirs(settings.CHUNKED_UPLOAD_ROOT, exist_ok=True)
+    chunk = tempfile.SpooledTemporaryFile(
+        CHUNK_SPOOL_SIZE, dir=settings.CHUNKED_UPLOAD_ROOT
+    )
+    try:
+        while True:
+            data = stream.read(CHUNK_READ_SIZE) if stream else b""
+            if not data:
+                break
+            offset += len(data)
+            if offset > upload.size:
+                raise UploadTooLarge(upload.size)
+            chunk.write(data)
+    except BaseException:
+        chunk.close()
+        raise
+    chunk.seek(0)
+    return chunk
+
+
+def write_chunk(upload, offset, chunk):
+    """
+    Append spooled `chunk` to `upload` at `offset` and return its new offset.
+
+    Bytes past the recorded offset, left by an interrupted chunk, are
+    discarded first. A partial file shorter than the recorded offset was
+    lost, and the offset is moved back to its size instead of filling the
+    gap with zeros. `upload` must be locked with `select_for_update` by the
+    caller, which saves the new offset.
+    """
+    if offset != upload.offset:
+        raise OffsetMismatch(upload.offset)
+    size = partial_size(upload)
+    if size < offset:
+        upload.offset = size
+        raise OffsetMismatch(size)
+
+    with open(partial_path(upload), "ab") as file:
+        file.truncate(offset)
+        shutil.copyfileobj(chunk, file, CHUNK_READ_SIZE)
+        return file.tell()
+
+
+def discard(upload):
+    """Remove the partial file of `upload`, if any."""
+    try:
+        os.remove(partial_path(upload))
+    except FileNotFoundError:
+        pass
@@ -6,12 +6,18 @@ from django.urls import path, include
 
 from rest_framework.routers import DefaultRouter
 
-from recipe.views import RecipeViewSet, TagViewSet, IngredientViewSet
+from recipe.views import (
+    RecipeViewSet,
+    TagViewSet,
+    IngredientViewSet,
+    ImportJobViewSet,
+)
 
 router = DefaultRouter()
 router.register("recipes", RecipeViewSet)
 router.register("tags", TagViewSet)
 router.register("ingredients", IngredientViewSet)
+router.register("imports", ImportJobViewSet)
 
 app_name = "recipe"
 
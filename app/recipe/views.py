@@ -1,13 +1,37 @@
 """
 Views for the recipe APIs
 """
-from rest_framework.mixins import ListModelMixin, UpdateModelMixin, DestroyModelMixin
+from rest_framework.mixins import (
+    CreateModelMixin,
+    ListModelMixin,
+    RetrieveModelMixin,
+    UpdateModelMixin,
+    DestroyModelMixin,
+)
 from rest_framework.viewsets import ModelViewSet, GenericViewSet
+from rest_framework.views import APIView
 from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import action
-from rest_framework.status import HTTP_400_BAD_REQUEST, HTTP_200_OK
+from rest_framework.status import (
+    HTTP_400_BAD_REQUEST,
+    HTTP_200_OK,
+    HTTP_201_CREATED,
+    HTTP_207_MULTI_STATUS,
+    HTTP_409_CONFLICT,
+    HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+)
 from rest_framework.response import Response
+from rest_framework.exceptions import ValidationError, NotFound
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.files import File
+from django.db import IntegrityError, transaction
+from django.http import StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.db.models import Case, CharField, Prefetch, Value, When
 
 from drf_spectacular.utils import (
     extend_schema,
@@ -16,15 +40,70 @@ from drf_spectacular.utils import (
     OpenApiTypes,
 )
 
-from core.models import Recipe, Tag, Ingredient
+from core.models import (
+    Recipe,
+    Tag,
+    Ingredient,
+    CollectionVersion,
+    ImportJob,
+    ImageUpload,
+    ImageDerivativeJob,
+)
+from recipe.batch import RecipeBatchWriter, INVALID
+from recipe.exports import RecipeExporter, EXPORT_FORMATS, NDJSON
+from recipe.images import image_metadata
+from recipe.media import image_filter, media_etag, send_media, MEDIA_CACHE_CONTROL
+from recipe.filters import RelationFilter, MATCH_CHOICES
+from recipe.mixins import ConditionalGetMixin, ResponseCacheMixin
+from recipe.pagination import RecipeCursorPagination
+from recipe.readers import RecipeListReader
+from recipe.search import search_recipes, autocomplete_names
+from recipe.uploads import (
+    spool_chunk,
+    write_chunk,
+    partial_path,
+    partial_size,
+    discard,
+    OffsetMismatch,
+    UploadTooLarge,
+)
 from recipe.serializers import (
     RecipeSerializer,
     RecipeDetailSerializer,
     TagSerializer,
     IngredientSerializer,
     RecipeImageSerializer,
+    RecipeBatchItemSerializer,
+    BulkDeleteSerializer,
+    BulkRenameSerializer,
+    ImportJobSerializer,
+    ImportJobDetailSerializer,
+    ImageUploadSerializer,
 )
 
+AUTOCOMPLETE_LIMIT = 10
+AUTOCOMPLETE_MAX_LIMIT = 25
+BATCH_MAX_SIZE = 500
+BULK_MAX_SIZE = 1000
+ATTR_ORDERING = ["-name", "name", "-recipe_count", "recipe_count"]
+DUPLICATE_NAME_ERROR = "An object with this name already exists."
+
+FIELD_SELECTION_PARAMETERS = [
+    OpenApiParameter(
+        "fields",
+        OpenApiTypes.STR,
+        description="Comma separated list of fields to return.",
+    ),
+    OpenApiParameter(
+        "expand",
+        OpenApiTypes.STR,
+        description=(
+            "Comma separated list of relations to return as nested objects "
+            "when `fields` is given. Other relations are returned as IDs."
+        ),
+    ),
+]
+
 
 @extend_schema_view(
     list=extend_schema(
@@ -32,40 +111,159 @@ from recipe.serializers import (
             OpenApiParameter(
                 "tags",
                 OpenApiTypes.STR,
-                description="Comma separated list of tag IDs to filter by",
+                description=(
+                    "Comma separated list of tag IDs to filter by. "
+                    "Prefix an ID with '-' to exclude it."
+                ),
+            ),
+            OpenApiParameter(
+                "tags_match",
+                OpenApiTypes.STR,
+                enum=MATCH_CHOICES,
+                description="Match any (default) or all of the included tags.",
             ),
             OpenApiParameter(
                 "ingredients",
                 OpenApiTypes.STR,
-                description="Comma separated list of ingredient IDs to filter by",
+                description=(
+                    "Comma separated list of ingredient IDs to filter by. "
+                    "Prefix an ID with '-' to exclude it."
+                ),
+            ),
+            OpenApiParameter(
+                "ingredients_match",
+                OpenApiTypes.STR,
+                enum=MATCH_CHOICES,
+                description="Match any (default) or all of the included ingredients.",
+            ),
+            OpenApiParameter(
+                "search",
+                OpenApiTypes.STR,
+                description="Full text search over title and description.",
+            ),
+            *FIELD_SELECTION_PARAMETERS,
+        ],
+    ),
+    retrieve=extend_schema(parameters=FIELD_SELECTION_PARAMETERS),
+    export=extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "type",
+                OpenApiTypes.STR,
+                enum=list(EXPORT_FORMATS),
+                description=f"Export file format (default {NDJSON}).",
             ),
         ],
+        responses={
+            (200, media_type): OpenApiTypes.BINARY
+            for media_type in EXPORT_FORMATS.values()
+        },
+    ),
+    batch=extend_schema(
+        request=RecipeBatchItemSerializer(many=True),
+        responses={(200, "application/json"): OpenApiTypes.OBJECT},
     ),
 )
-class RecipeViewSet(ModelViewSet):
+class RecipeViewSet(ResponseCacheMixin, ConditionalGetMixin, ModelViewSet):
     """Viewset for the Recipe model."""
 
     serializer_class = RecipeDetailSerializer
     queryset = Recipe.objects.all()
     authentication_classes = [TokenAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = RecipeCursorPagination
+    relation_filters = [RelationFilter("tags"), RelationFilter("ingredients")]
+    relation_fields = ["tags", "ingredients"]
+    cache_list_params = ["tags", "ingredients", "fields", "expand"]
+
+    def _get_query_list(self, param):
+        """Return the comma separated values of `param`, or None if absent."""
+        value = self.request.query_params.get(param)
+        if value is None:
+            return None
+        return [name.strip() for name in value.split(",") if name.strip()]
+
+    def get_field_selection(self):
+        """Return the `(fields, expand)` requested for read actions."""
+        if self.action not in ["list", "retrieve"]:
+            return None, []
+        fields = self._get_query_list("fields")
+        expand = self._get_query_list("expand") or []
+        allowed = self.get_serializer_class().Meta.fields
+        errors = {}
+        unknown = [name for name in fields or [] if name not in allowed]
+        if unknown:
+            errors["fields"] = f"Unknown fields: {', '.join(unknown)}."
+        unknown = [name for name in expand if name not in self.relation_fields]
+        if unknown:
+            errors["expand"] = f"Unknown relations: {', '.join(unknown)}."
+        if errors:
+            raise ValidationError(errors)
+        return fields, expand
+
+    def _prefetch(self, name, *fields):
+        """Return a prefetch of relation `name` loading `fields`, ordered by ID."""
+        model = Recipe._meta.get_field(name).related_model
+        return Prefetch(name, queryset=model.objects.only(*fields).order_by("id"))
 
-    def _params_to_ints(self, qs):
-        """Convert a list of string IDs to a list of integers."""
-        return [int(str_id) for str_id in qs.split(",")]
+    def _select_fields(self, queryset):
+        """Load only the columns and relations the response will contain."""
+        fields, expand = self.get_field_selection()
+        if fields is None:
+            return queryset.defer("search_vector").prefetch_related(
+                *(self._prefetch(name, "id", "name") for name in self.relation_fields)
+            )
+
+        serializer_fields = self.get_serializer_class()().fields
+        columns = [
+            serializer_fields[name].source
+            for name in fields
+            if name not in self.relation_fields
+        ]
+        lookups = []
+        for name in self.relation_fields:
+            if name in expand and name in fields:
+                lookups.append(self._prefetch(name, "id", "name"))
+            elif name in fields:
+                lookups.append(self._prefetch(name, "id"))
+        return queryset.only("id", *columns).prefetch_related(*lookups)
+
+    def get_filtered_queryset(self):
+        """Return the user's recipes filtered and ordered by the query params."""
+        queryset = self.queryset.filter(user=self.request.user)
+        for relation_filter in self.relation_filters:
+            queryset = relation_filter.filter_queryset(
+                self.request.query_params, queryset
+            )
+        search = self.request.query_params.get("search", "").strip()
+        if search:
+            return search_recipes(queryset, search).order_by("-search_rank", "-id")
+        return queryset.order_by("-id")
 
     def get_queryset(self):
         """Return objects for the current authenticated user only."""
-        tags = self.request.query_params.get("tags")
-        ingredients = self.request.query_params.get("ingredients")
-        queryset = self.queryset
-        if tags:
-            tag_ids = self._params_to_ints(tags)
-            queryset = queryset.filter(tags__id__in=tag_ids)
-        if ingredients:
-            ingredient_ids = self._params_to_ints(ingredients)
-            queryset = queryset.filter(ingredients__id__in=ingredient_ids)
-        return queryset.filter(user=self.request.user).order_by("-id").distinct()
+        return self._select_fields(self.get_filtered_queryset())
+
+    def _list(self, request, *args, **kwargs):
+        """List recipes from value rows, without creating model instances."""
+        reader = RecipeListReader(
+            *self.get_field_selection(), context=self.get_serializer_context()
+        )
+        page = self.paginate_queryset(reader.values(self.get_filtered_queryset()))
+        return self.get_paginated_response(reader.serialize(page))
+
+    def list(self, request, *args, **kwargs):
+        """List recipes unless the client's copy is current."""
+        return self.conditional_response(self._list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        """Retrieve a recipe unless the client's copy is current."""
+        return self.conditional_response(super().retrieve, request, *args, **kwargs)
+
+    def perform_content_negotiation(self, request, force=False):
+        """Accept the CSV and NDJSON media types of exports in `Accept`."""
+        force = force or self.action == "export"
+        return super().perform_content_negotiation(request, force=force)
 
     def get_serializer_class(self):
         """Return appropriate serializer class."""
@@ -73,22 +271,195 @@ class RecipeViewSet(ModelViewSet):
             return RecipeSerializer
         if self.action == "upload_image":
             return RecipeImageSerializer
+        if self.action == "batch":
+            return RecipeBatchItemSerializer
+        if self.action in ["start_upload", "upload_chunk"]:
+            return ImageUploadSerializer
+        if self.action == "finish_upload":
+            return RecipeImageSerializer
         return self.serializer_class
 
+    def get_serializer(self, *args, **kwargs):
+        """Return a serializer limited to the requested fields."""
+        fields, expand = self.get_field_selection()
+        if fields is not None:
+            kwargs.update(fields=fields, expand=expand)
+        return super().get_serializer(*args, **kwargs)
+
     def perform_create(self, serializer):
         """Create a new recipe."""
         serializer.save(user=self.request.user)
 
+    def perform_destroy(self, instance):
+        """Delete a recipe."""
+        instance.delete()
+        CollectionVersion.objects.bump(self.request.user)
+
+    def _save_image(self, serializer):
+        """Save a validated image with its metadata and queue its derivatives."""
+        metadata = image_metadata(serializer.validated_data["image"])
+        with transaction.atomic():
+            recipe = serializer.save(image_derivatives="", **metadata)
+            ImageDerivativeJob.objects.enqueue(recipe.image.name)
+            CollectionVersion.objects.bump(self.request.user)
+        recipe.refresh_from_db(fields=["image_derivatives"])
+
     @action(methods=["POST"], detail=True, url_path="upload-image")
     def upload_image(self, request, pk=None):
         """Upload an image to a recipe."""
         recipe = self.get_object()
         serializer = self.get_serializer(recipe, data=request.data, partial=True)
         if serializer.is_valid():
-            serializer.save()
+            self._save_image(serializer)
             return Response(serializer.data, status=HTTP_200_OK)
         return Response(serializer.errors, status=HTTP_400_BAD_REQUEST)
 
+    def get_upload(self, upload_id, lock=False):
+        """Return the user's chunked upload `upload_id` for the recipe, or 404."""
+        recipe = self.get_object()
+        queryset = ImageUpload.objects.active().filter(
+            user=self.request.user, recipe=recipe
+        )
+        if lock:
+            queryset = queryset.select_for_update()
+        try:
+            return queryset.get(id=upload_id)
+        except (ImageUpload.DoesNotExist, DjangoValidationError):
+            raise NotFound()
+
+    @action(methods=["POST"], detail=True, url_path="uploads")
+    def start_upload(self, request, pk=None):
+        """
+        Start a chunked upload of an image of `size` bytes.
+
+        Each user can have at most `MAX_OPEN_UPLOADS` uploads open at a time.
+        The user's row is locked while they are counted, so concurrent
+        requests cannot go past the limit.
+        """
+        recipe = self.get_object()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            get_user_model().objects.select_for_update().get(pk=request.user.pk)
+            uploads = ImageUpload.objects.active().filter(user=request.user)
+            if uploads.count() >= settings.MAX_OPEN_UPLOADS:
+                limit = settings.MAX_OPEN_UPLOADS
+                return Response(
+                    {"non_field_errors": [f"At most {limit} uploads can be open."]},
+                    status=HTTP_400_BAD_REQUEST,
+                )
+            serializer.save(user=request.user, recipe=recipe)
+        return Response(serializer.data, status=HTTP_201_CREATED)
+
+    @action(
+        methods=["GET", "PUT"],
+        detail=True,
+        url_path=r"uploads/(?P<upload_id>[0-9a-f-]+)",
+    )
+    def upload_chunk(self, request, pk=None, upload_id=None):
+        """
+        Return the upload's offset, or append the request body to it.
+
+        Chunks must start at the current offset, given in the `Upload-Offset`
+        header, so a client resumes by reading the offset and sending the
+        rest of the file from there. The chunk is read before the upload is
+        locked, so the row lock is only held while it is written to disk.
+        """
+        if request.method == "GET":
+            upload = self.get_upload(upload_id)
+            return Response(self.get_serializer(upload).data, status=HTTP_200_OK)
+
+        try:
+            offset = int(request.META["HTTP_UPLOAD_OFFSET"])
+        except (KeyError, ValueError):
+            raise ValidationError({"Upload-Offset": "A valid integer is required."})
+        upload = self.get_upload(upload_id)
+        try:
+            chunk = spool_chunk(upload, offset, request.stream)
+        except OffsetMismatch:
+            return Response({"offset": upload.offset}, status=HTTP_409_CONFLICT)
+        except UploadTooLarge:
+            return Response(
+                {"size": f"The upload is limited to {upload.size} bytes."},
+                status=HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            )
+        with chunk, transaction.atomic():
+            upload = self.get_upload(upload_id, lock=True)
+            try:
+                upload.offset = write_chunk(upload, offset, chunk)
+            except OffsetMismatch:
+                upload.save(update_fields=["offset"])
+                return Response({"offset": upload.offset}, status=HTTP_409_CONFLICT)
+            upload.save(update_fields=["offset"])
+        return Response(self.get_serializer(upload).data, status=HTTP_200_OK)
+
+    @action(
+        methods=["POST"],
+        detail=True,
+        url_path=r"uploads/(?P<upload_id>[0-9a-f-]+)/finalize",
+    )
+    def finish_upload(self, request, pk=None, upload_id=None):
+        """Attach a completed chunked upload to the recipe as its image."""
+        with transaction.atomic():
+            upload = self.get_upload(upload_id, lock=True)
+            if partial_size(upload) < upload.offset:
+                upload.offset = partial_size(upload)
+                upload.save(update_fields=["offset"])
+            if upload.offset != upload.size:
+                return Response(
+                    {"offset": f"{upload.offset} of {upload.size} bytes received."},
+                    status=HTTP_409_CONFLICT,
+                )
+            with open(partial_path(upload), "rb") as file:
+                image = File(file, name=upload.filename)
+                serializer = self.get_serializer(
+                    upload.recipe, data={"image": image}, partial=True
+                )
+                if not serializer.is_valid():
+                    return Response(serializer.errors, status=HTTP_400_BAD_REQUEST)
+                self._save_image(serializer)
+            discard(upload)
+            upload.delete()
+        return Response(serializer.data, status=HTTP_200_OK)
+
+    @action(methods=["GET"], detail=False)
+    def export(self, request):
+        """Stream all of the user's recipes as NDJSON or CSV."""
+        export_format = request.query_params.get("type", NDJSON)
+        if export_format not in EXPORT_FORMATS:
+            raise ValidationError(
+                {"type": f"Must be one of: {', '.join(EXPORT_FORMATS)}."}
+            )
+
+        queryset = self.queryset.filter(user=request.user).order_by("id")
+        response = StreamingHttpResponse(
+            RecipeExporter().stream(export_format, queryset),
+            content_type=EXPORT_FORMATS[export_format],
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="recipes.{export_format}"'
+        )
+        return response
+
+    @action(methods=["POST"], detail=False)
+    def batch(self, request):
+        """Create or update a list of recipes in one transaction."""
+        if not isinstance(request.data, list):
+            return Response(
+                {"non_field_errors": ["Expected a list of recipes."]},
+                status=HTTP_400_BAD_REQUEST,
+            )
+        if len(request.data) > BATCH_MAX_SIZE:
+            return Response(
+                {"non_field_errors": [f"At most {BATCH_MAX_SIZE} recipes per batch."]},
+                status=HTTP_400_BAD_REQUEST,
+            )
+
+        results = RecipeBatchWriter(request.user).write(request.data)
+        failed = any(result["status"] == INVALID for result in results)
+        status = HTTP_207_MULTI_STATUS if failed else HTTP_200_OK
+        return Response(results, status=status)
+
 
 @extend_schema_view(
     list=extend_schema(
@@ -99,24 +470,159 @@ class RecipeViewSet(ModelViewSet):
                 enum=[0, 1],
                 description="Filter by items assigned to recipes.",
             ),
+            OpenApiParameter(
+                "recipe_count",
+                OpenApiTypes.INT,
+                enum=[0, 1],
+                description="Include the number of recipes using each item.",
+            ),
+            OpenApiParameter(
+                "ordering",
+                OpenApiTypes.STR,
+                enum=ATTR_ORDERING,
+                description=f"Sort order (default {ATTR_ORDERING[0]}).",
+            ),
         ]
-    )
+    ),
+    autocomplete=extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "q",
+                OpenApiTypes.STR,
+                description="Name prefix or approximate name to complete.",
+            ),
+            OpenApiParameter(
+                "limit",
+                OpenApiTypes.INT,
+                description="Maximum number of suggestions "
+                f"(default {AUTOCOMPLETE_LIMIT}, max {AUTOCOMPLETE_MAX_LIMIT}).",
+            ),
+        ]
+    ),
+    bulk_delete=extend_schema(
+        request=BulkDeleteSerializer,
+        responses={(200, "application/json"): OpenApiTypes.OBJECT},
+    ),
+    bulk_rename=extend_schema(
+        request=BulkRenameSerializer,
+        responses={(200, "application/json"): OpenApiTypes.OBJECT},
+    ),
 )
 class BaseRecipeAttrViewSet(
-    DestroyModelMixin, ListModelMixin, UpdateModelMixin, GenericViewSet
+    ResponseCacheMixin,
+    ConditionalGetMixin,
+    DestroyModelMixin,
+    ListModelMixin,
+    UpdateModelMixin,
+    GenericViewSet,
 ):
     """Base viewset for user owned recipe attributes."""
 
     authentication_classes = [TokenAuthentication]
     permission_classes = [IsAuthenticated]
 
+    def list(self, request, *args, **kwargs):
+        """List objects unless the client's copy is current."""
+        return self.conditional_response(super().list, request, *args, **kwargs)
+
+    def perform_update(self, serializer):
+        """Update an object."""
+        try:
+            with transaction.atomic():
+                serializer.save()
+        except IntegrityError:
+            raise ValidationError({"name": DUPLICATE_NAME_ERROR})
+        CollectionVersion.objects.bump(self.request.user)
+
+    def perform_destroy(self, instance):
+        """Delete an object."""
+        instance.delete()
+        CollectionVersion.objects.bump(self.request.user)
+
+    def _get_flag(self, param):
+        """Return whether the `param` query param is set to a true integer."""
+        return bool(int(self.request.query_params.get(param, 0)))
+
     def get_queryset(self):
         """Return objects for the current authenticated user only."""
-        assigned_only = bool(int(self.request.query_params.get("assigned_only", 0)))
-        queryset = self.queryset
-        if assigned_only:
-            queryset = queryset.filter(recipe__isnull=False)
-        return queryset.filter(user=self.request.user).order_by("-name").distinct()
+        queryset = self.queryset.filter(user=self.request.user)
+        if self._get_flag("assigned_only"):
+            queryset = queryset.filter(recipe_count__gt=0)
+        ordering = self.request.query_params.get("ordering", ATTR_ORDERING[0])
+        if ordering not in ATTR_ORDERING:
+            raise ValidationError(
+                {"ordering": f"Must be one of: {', '.join(ATTR_ORDERING)}."}
+            )
+        return queryset.order_by(ordering, "id")
+
+    def get_serializer(self, *args, **kwargs):
+        """Return a serializer including recipe counts when requested."""
+        if self.action == "list" and self._get_flag("recipe_count"):
+            kwargs["recipe_count"] = True
+        return super().get_serializer(*args, **kwargs)
+
+    @action(methods=["GET"], detail=False)
+    def autocomplete(self, request):
+        """Suggest names matching the `q` query param."""
+        term = request.query_params.get("q", "").strip()
+        try:
+            limit = int(request.query_params.get("limit", AUTOCOMPLETE_LIMIT))
+        except ValueError:
+            return Response(
+                {"limit": "A valid integer is required."}, status=HTTP_400_BAD_REQUEST
+            )
+        limit = max(1, min(limit, AUTOCOMPLETE_MAX_LIMIT))
+        if not term:
+            return Response([], status=HTTP_200_OK)
+
+        queryset = self.queryset.filter(user=request.user)
+        suggestions = autocomplete_names(queryset, term, limit)
+        serializer = self.get_serializer(suggestions, many=True)
+        return Response(serializer.data, status=HTTP_200_OK)
+
+    def _validate_bulk(self, serializer_class, field):
+        """Return the validated `field` of the request body, or raise."""
+        serializer = serializer_class(data=self.request.data)
+        serializer.is_valid(raise_exception=True)
+        values = serializer.validated_data[field]
+        if len(values) > BULK_MAX_SIZE:
+            raise ValidationError({field: f"At most {BULK_MAX_SIZE} per request."})
+        return values
+
+    @action(methods=["POST"], detail=False, url_path="bulk-delete")
+    def bulk_delete(self, request):
+        """Delete the user's objects listed in `ids`."""
+        ids = self._validate_bulk(BulkDeleteSerializer, "ids")
+        queryset = self.queryset.filter(user=request.user, id__in=ids)
+        with transaction.atomic():
+            total, counts = queryset.delete()
+            deleted = counts.get(self.queryset.model._meta.label, 0)
+            if deleted:
+                CollectionVersion.objects.bump(request.user)
+
+        unlinked = total - deleted
+        return Response({"deleted": deleted, "unlinked": unlinked}, status=HTTP_200_OK)
+
+    @action(methods=["POST"], detail=False, url_path="bulk-rename")
+    def bulk_rename(self, request):
+        """Rename the user's objects listed in `items` with one UPDATE."""
+        items = self._validate_bulk(BulkRenameSerializer, "items")
+        names = Case(
+            *(When(id=item["id"], then=Value(item["name"])) for item in items),
+            output_field=CharField(),
+        )
+        queryset = self.queryset.filter(
+            user=request.user, id__in=[item["id"] for item in items]
+        )
+        try:
+            with transaction.atomic():
+                renamed = queryset.update(name=names)
+        except IntegrityError:
+            raise ValidationError({"items": DUPLICATE_NAME_ERROR})
+        if renamed:
+            CollectionVersion.objects.bump(request.user)
+
+        return Response({"renamed": renamed}, status=HTTP_200_OK)
 
 
 class TagViewSet(BaseRecipeAttrViewSet):
@@ -131,3 +637,66 @@ class IngredientViewSet(BaseRecipeAttrViewSet):
 
     serializer_class = IngredientSerializer
     queryset = Ingredient.objects.all()
+
+
+class ImportJobViewSet(
+    CreateModelMixin, ListModelMixin, RetrieveModelMixin, GenericViewSet
+):
+    """Viewset for recipe import jobs, processed by `process_imports` workers."""
+
+    serializer_class = ImportJobDetailSerializer
+    queryset = ImportJob.objects.all()
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        """Return jobs for the current authenticated user only."""
+        queryset = self.queryset.filter(user=self.request.user).order_by("-id")
+        if self.action == "list":
+            return queryset.defer("errors")
+        return queryset
+
+    def get_serializer_class(self):
+        """Return appropriate serializer class."""
+        if self.action in ["list", "create"]:
+            return ImportJobSerializer
+        return self.serializer_class
+
+    def perform_create(self, serializer):
+        """Queue a new import job."""
+        serializer.save(user=self.request.user)
+
+
+class RecipeMediaView(APIView):
+    """
+    View serving recipe images and derivatives to the users owning them.
+
+    Only the ownership check and cache validation run in Django, the bytes
+    are sent by the front proxy when `MEDIA_SENDFILE` is set.
+    """
+
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def perform_content_negotiation(self, request, force=False):
+        """Accept any `Accept` header, as browsers ask for images."""
+        return super().perform_content_negotiation(request, force=True)
+
+    @extend_schema(responses={(200, "*/*"): OpenApiTypes.BINARY})
+    def get(self, request, name):
+        """Return media `name`, or a 304 for a client already holding it."""
+        lookup = image_filter(name)
+        recipes = Recipe.objects.filter(user=request.user)
+        if lookup is None or not recipes.filter(lookup).exists():
+            raise NotFound()
+
+        etag = media_etag(name)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            try:
+                response = send_media(request, name, etag)
+            except FileNotFoundError:
+                raise NotFound()
+        response["ETag"] = etag
+        response["Cache-Control"] = MEDIA_CACHE_CONTROL
+        return response